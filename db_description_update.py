@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
+import functools
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import re
 import sqlite3
-from typing import Any
-from docx import Document
-from docx.oxml.shared import qn
+
+from docx_fields import read_fields
 
 # Resolve directories so paths work regardless of current working directory
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -16,6 +17,23 @@ DOCX_FOLDER = str(SCRIPT_DIR / "descriptions")
 # Database lives under project public/data
 DB_PATH = str(PROJECT_ROOT / "public" / "data" / "collections.db")
 
+# SQLite settings for the bulk import: WAL journal, fsync only at checkpoints,
+# temp tables in memory and a 64MB page cache. Locking stays NORMAL: the
+# watcher and the MCP server read the database while the import runs, and
+# busy_timeout makes the import wait for them instead of failing.
+BULK_PRAGMAS = (
+    "busy_timeout=5000",
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+)
+
+# Descriptions written per transaction; each batch is committed and the WAL
+# checkpointed (synchronous=NORMAL syncs the database at each checkpoint), so
+# a crash or power loss only loses the current batch
+BATCH_SIZE = 100
+
 # Collection IDs (from the database)
 CINQUECENTINE_COLLECTION_ID = 4
 INCUNABOLI_COLLECTION_ID = 3
@@ -44,6 +62,26 @@ FIELD_MAP = {
     "": None  # fallback
 }
 
+# Every description column, in FIELD_MAP order
+DESCRIPTION_COLS = tuple(db_col for db_col in FIELD_MAP.values() if db_col)
+# Built once so sqlite3 reuses the same prepared statement for every row.
+# COALESCE keeps the stored value of columns missing from a file on update.
+UPSERT_SQL = (
+    f"INSERT INTO book_descriptions (book_id, collection_id, number, language, {', '.join(DESCRIPTION_COLS)}) "
+    f"VALUES ({', '.join('?' for _ in range(4 + len(DESCRIPTION_COLS)))}) "
+    f"ON CONFLICT(book_id, language) DO UPDATE SET "
+    f"{', '.join(f'{col} = COALESCE(excluded.{col}, {col})' for col in DESCRIPTION_COLS)}"
+)
+
+# === PRECOMPILED PATTERNS ===
+# Label (lowercased) → DB column, for docx_fields.scan_fields
+LABEL_TO_COL = {key.lower(): db_col for key, db_col in FIELD_MAP.items() if db_col}
+FILENAME_RE = re.compile(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA')
+EMPTY_A_RE = re.compile(r'<a\s+href="[^"]*"[^>]*>\s*</a>')
+# Stripped from both ends of a book number by normalize_book_number
+DIGITS = "0123456789"
+
+@functools.lru_cache(maxsize=8192)
 def normalize_book_number(number):
     """Normalize book number to handle different formats like 5A01 vs 5A1"""
     if not number:
@@ -52,188 +90,127 @@ def normalize_book_number(number):
     # Remove any extra spaces and convert to uppercase
     number = str(number).strip().upper()
     
-    # Handle patterns like 5A01 -> 5A1 (remove leading zero in the number part)
-    match = re.match(r'^(\d+)([A-Z]+)(\d+)$', number)
-    if match:
-        prefix, letter, num = match.groups()
+    # Handle patterns like 5A01 -> 5A1 (remove leading zero in the number part):
+    # digits, then A-Z letters, then digits, split with str.rstrip/lstrip
+    head = number.rstrip(DIGITS)
+    letters = head.lstrip(DIGITS)
+    if letters and len(letters) < len(head) < len(number) and letters.isalpha() and letters.isascii():
         # Remove leading zeros from the number part
-        normalized_num = str(int(num))
-        return f"{prefix}{letter}{normalized_num}"
+        return f"{head}{int(number[len(head):])}"
     
     return number
 
-def determine_collection_from_filename(filename):
-    """Determine which collection this file belongs to based on the number"""
+def parse_filename(filename):
+    """Return (file_number, collection_id, collection_name) from one match of the filename"""
     # Extract number from filename
-    match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
+    match = FILENAME_RE.search(filename)
     if not match:
-        return None, None
+        return None, None, None
     
-    file_number = match.group(1).upper()
+    file_number = match.group(1).upper()  # e.g., "5A01" or "4B1"
     
     # Cinquecentine: 5A01, 5B13, etc. (starts with 5)
     if file_number.startswith('5'):
-        return CINQUECENTINE_COLLECTION_ID, "cinquecentine"
+        return file_number, CINQUECENTINE_COLLECTION_ID, "cinquecentine"
     
     # Incunaboli: 4B1, 4C2, etc. (starts with 4)  
     elif file_number.startswith('4'):
-        return INCUNABOLI_COLLECTION_ID, "incunaboli"
+        return file_number, INCUNABOLI_COLLECTION_ID, "incunaboli"
     
-    return None, None
-
-def extract_hyperlinks_from_paragraph(paragraph):
-    """Extract paragraph text while preserving the exact run order so
-    punctuation and link placement remain the same as in Word.
-
-    We iterate over the paragraph.runs in document order. If a run is
-    wrapped in a hyperlink element we try to resolve its relationship id
-    to a target URL and emit an anchor tag for that run's text. Otherwise
-    we emit the run text verbatim. This preserves punctuation that may
-    be placed in separate runs after or before the linked text.
-    """
-
-    parts = []
-
-    for run in paragraph.runs:
-        # Determine whether this run is inside a <w:hyperlink> element
-        run_parent = run._element.getparent()
-        if run_parent is not None and run_parent.tag is not None and run_parent.tag.endswith('hyperlink'):
-            rel_id = run_parent.get(qn('r:id'))
-            hyperlink_url = None
-            if rel_id and rel_id in paragraph.part.rels:
-                hyperlink_url = paragraph.part.rels[rel_id].target_ref
-
-            run_text = run.text or ''
-            if hyperlink_url and run_text.strip():
-                parts.append(f'<a href="{hyperlink_url}" target="_blank">{run_text}</a>')
-            else:
-                parts.append(run_text)
-        else:
-            parts.append(run.text or '')
-
-    joined = ''.join(parts)
-
-    # If there were no hyperlinks, fall back to the simple paragraph text
-    if '<a href=' not in joined:
-        return (paragraph.text or '').strip()
-
-    return joined
+    return file_number, None, None
 
 # === HELPER ===
 def extract_data_from_docx(docx_path):
-    doc = Document(docx_path)
-    
-    # Extract text with hyperlinks preserved
-    full_text_with_links = ""
-    paragraph_texts = []
-    
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            # Try to extract with hyperlinks
-            text_with_links = extract_hyperlinks_from_paragraph(paragraph)
-            paragraph_texts.append(text_with_links)
-            full_text_with_links += text_with_links + "\n"
-    
-    # Also get plain text for regex matching (fallback)
-    plain_text = "\n".join([p.text.strip() for p in doc.paragraphs if p.text.strip()])
+    # Fields with hyperlinks kept as HTML, missing ones filled from the plain text
+    found = read_fields(docx_path, LABEL_TO_COL)
     
     data = {}
-    for key, db_col in FIELD_MAP.items():
-        if not db_col:
-            continue
-        
-        # First try to find the field in text with links
-        match = re.search(rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zÀ-ÿ ]+?:|\Z)", full_text_with_links, re.DOTALL | re.IGNORECASE)
-        
-        # If not found, try plain text
-        if not match:
-            match = re.search(rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zÀ-ÿ ]+?:|\Z)", plain_text, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            value = match.group(1).strip()
-            # Clean up whitespace but preserve HTML tags
-            value = re.sub(r'\s+', ' ', value)
+    # Emit fields in FIELD_MAP order
+    for db_col in LABEL_TO_COL.values():
+        if db_col in found:
+            # Strip and collapse whitespace (str.split, no regex) but preserve HTML tags
+            value = ' '.join(found[db_col].split())
             # Clean up any malformed HTML
-            value = re.sub(r'<a\s+href="([^"]*)"[^>]*>\s*</a>', '', value)  # Remove empty links
+            if '<a' in value:
+                value = EMPTY_A_RE.sub('', value)  # Remove empty links
             data[db_col] = value
             
     return data
 
-def find_matching_book(cursor, file_number, collection_id):
+def extract_data_job(docx_path):
+    """Worker entry point: return (data, None), or (None, error message) on failure"""
+    try:
+        return extract_data_from_docx(docx_path), None
+    except Exception as e:
+        return None, str(e)
+
+def build_book_index(cursor):
+    """Load the books of both collections once and index them for file-number lookups.
+
+    Returns two dicts keyed by (collection_id, number): one on the uppercased
+    number for exact matches and one on the normalized number (5A01 == 5A1).
+    """
+    cursor.execute(
+        "SELECT book_id, number, collection_id FROM books WHERE collection_id IN (?, ?)",
+        (CINQUECENTINE_COLLECTION_ID, INCUNABOLI_COLLECTION_ID)
+    )
+    exact_index = {}
+    normalized_index = {}
+    for book_id, db_number, collection_id in cursor.fetchall():
+        if db_number is None:
+            continue
+        # First row wins, like the per-file queries this replaces
+        exact_index.setdefault((collection_id, str(db_number).upper()), (book_id, db_number))
+        normalized_index.setdefault((collection_id, normalize_book_number(db_number)), (book_id, db_number))
+    return exact_index, normalized_index
+
+def find_matching_book(book_index, file_number, collection_id):
     """Find a book in the specified collection that matches the file number"""
-    
-    # Normalize the file number
-    normalized_file_number = normalize_book_number(file_number)
+    exact_index, normalized_index = book_index
     
     # Try to find exact match first
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ? AND UPPER(number) = ?", 
-        (collection_id, file_number.upper())
-    )
-    result = cursor.fetchone()
+    result = exact_index.get((collection_id, file_number.upper()))
     if result:
         return result
     
     # Try normalized match
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ?", 
-        (collection_id,)
-    )
-    books = cursor.fetchall()
-    
-    for book_id, db_number in books:
-        if normalize_book_number(db_number) == normalized_file_number:
-            return (book_id, db_number)
-    
-    return None
+    return normalized_index.get((collection_id, normalize_book_number(file_number)))
 
-def insert_or_update_description(cursor, book_id, collection_id, book_number, data):
-    """Insert or update book description in the book_descriptions table"""
-    
-    # Check if description already exists
-    cursor.execute(
-        "SELECT description_id FROM book_descriptions WHERE book_id = ? AND language = 'it'",
-        (book_id,)
-    )
-    existing = cursor.fetchone()
-    
-    # Prepare full data including required fields
-    full_data = {
-        'book_id': book_id,
-        'collection_id': collection_id,
-        'number': book_number,
-        'language': 'it',
-        **data  # Add extracted description data
-    }
-    
-    if existing:
-        # Update existing description
-        description_id = existing[0]
-        set_clauses = []
-        values = []
-        
-        for key, value in data.items():
-            set_clauses.append(f"{key} = ?")
-            values.append(value)
-        
-        if set_clauses:
-            values.append(description_id)
-            sql = f"UPDATE book_descriptions SET {', '.join(set_clauses)} WHERE description_id = ?"
-            cursor.execute(sql, values)
-            return "updated"
-    else:
-        # Insert new description
-        columns = list[Any](full_data.keys())
-        placeholders = ['?' for _ in columns]
-        
-        sql = f"INSERT INTO book_descriptions ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(sql, list(full_data.values()))
-        return "inserted"
+def write_descriptions(cursor, pending):
+    """Upsert queued descriptions into the book_descriptions table.
+
+    Every row binds all description columns (None for the ones not extracted),
+    so a single executemany of UPSERT_SQL writes them all. Existing
+    descriptions (UNIQUE(book_id, language)) only get the extracted columns
+    updated, as before.
+    """
+    rows = [
+        (book_id, collection_id, book_number, 'it', *(data.get(col) for col in DESCRIPTION_COLS))
+        for book_id, collection_id, book_number, data in pending
+    ]
+    cursor.executemany(UPSERT_SQL, rows)
+
+def flush_descriptions(conn, cursor, pending):
+    """Write and commit one batch of queued descriptions, then checkpoint the WAL.
+
+    A failed batch is rolled back and reported; returns whether it was written.
+    """
+    try:
+        write_descriptions(cursor, pending)
+    except sqlite3.Error as e:
+        print(f"❌ Database error while writing descriptions: {e}")
+        conn.rollback()
+        return False
+    conn.commit()
+    cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return True
 
 # === MAIN SCRIPT ===
 def update_db_from_docx():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    for pragma in BULK_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
 
     # Check if book_descriptions table exists
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'")
@@ -258,36 +235,64 @@ def update_db_from_docx():
     print(f"📚 Found {cinquecentine_books} books in cinquecentine collection (ID: {CINQUECENTINE_COLLECTION_ID})")
     print(f"📚 Found {incunaboli_books} books in incunaboli collection (ID: {INCUNABOLI_COLLECTION_ID})")
 
+    # Index all books once instead of querying the books table for every file
+    book_index = build_book_index(cursor)
+    
+    # Books that already have a description, to report inserts vs updates
+    cursor.execute("SELECT book_id FROM book_descriptions WHERE language = 'it'")
+    described_books = {row[0] for row in cursor.fetchall()}
+    pending = []
+    pending_updates = 0
+
     processed_count = 0
     updated_count = 0
     inserted_count = 0
     not_found_count = 0
 
-    for filename in os.listdir(DOCX_FOLDER):
-        if not filename.endswith((".docx", ".doc")):
-            continue
+    # Resolve every file to its book first, so the matched files can be
+    # extracted in parallel while the database work stays in this process
+    entries = []
+    # "~$..." files are Word's lock files for open documents, not descriptions
+    with os.scandir(DOCX_FOLDER) as it:
+        files = [entry for entry in it if entry.is_file() and not entry.name.startswith("~$")]
+    docx_entries = [entry for entry in files if entry.name.endswith(".docx")]
+    # Legacy binary .doc files are not zip packages and cannot be parsed here
+    legacy_docs = [entry.name for entry in files if entry.name.endswith(".doc")]
+    if legacy_docs:
+        print(f"⚠️  Skipping {len(legacy_docs)} legacy .doc file(s), convert them first with:")
+        print(f"   libreoffice --headless --convert-to docx --outdir \"{DOCX_FOLDER}\" \"{DOCX_FOLDER}\"/*.doc")
+    for entry in docx_entries:
+        filename = entry.name
 
         # Extract number and determine collection
-        match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
-        if not match:
+        file_number, collection_id, collection_name = parse_filename(filename)
+        book_match = find_matching_book(book_index, file_number, collection_id) if collection_id else None
+        entries.append((filename, entry.path, file_number, collection_id, collection_name, book_match))
+
+    docx_paths = [docx_path for _, docx_path, *_, book_match in entries if book_match]
+    extracted = {}
+    if docx_paths:
+        with ProcessPoolExecutor() as executor:
+            extracted = dict(zip(docx_paths, executor.map(extract_data_job, docx_paths, chunksize=4)))
+
+    # Explicit transaction for the first batch, opened only now that the files
+    # are parsed so the write lock is not held during extraction; sqlite3
+    # opens the next ones
+    cursor.execute("BEGIN")
+
+    for filename, docx_path, file_number, collection_id, collection_name, book_match in entries:
+        if not file_number:
             print(f"❌ Could not extract number from: {filename}")
             continue
-
-        file_number = match.group(1).upper()  # e.g., "5A01" or "4B1"
-        collection_id, collection_name = determine_collection_from_filename(filename)
         
         if not collection_id:
             print(f"❌ Could not determine collection for: {filename} (number: {file_number})")
             continue
         
-        docx_path = os.path.join(DOCX_FOLDER, filename)
-        
         print(f"\n🔍 Processing: {filename}")
         print(f"   📂 Collection: {collection_name} (ID: {collection_id})")
         print(f"   📖 Book number: {file_number}")
         
-        # Find matching book in database
-        book_match = find_matching_book(cursor, file_number, collection_id)
         if not book_match:
             print(f"❌ No book found in {collection_name} collection for number: {file_number}")
             not_found_count += 1
@@ -296,35 +301,42 @@ def update_db_from_docx():
         book_id, db_number = book_match
         print(f"✅ Found matching book: {db_number} (ID: {book_id})")
         
-        try:
-            data = extract_data_from_docx(docx_path)
-        except Exception as e:
-            print(f"❌ Error processing {filename}: {e}")
+        data, error = extracted[docx_path]
+        if error:
+            print(f"❌ Error processing {filename}: {error}")
             continue
 
         if not data:
             print(f"⚠️ No metadata extracted from {filename}")
             continue
 
-        # Insert or update description in book_descriptions table
-        try:
-            action = insert_or_update_description(cursor, book_id, collection_id, db_number, data)
-            if action == "updated":
-                print(f"✅ Updated description for book {db_number}")
-                updated_count += 1
-            else:
-                print(f"✅ Inserted new description for book {db_number}")
-                inserted_count += 1
-            
-            # Print some sample data to verify hyperlinks
-            for col, value in list(data.items())[:2]:
-                if '<a href=' in str(value):
-                    print(f"   📎 {col}: {value[:100]}...")
-        except sqlite3.Error as e:
-            print(f"❌ Database error for book {db_number}: {e}")
+        # Queue the description; rows are written BATCH_SIZE at a time
+        pending.append((book_id, collection_id, db_number, data))
+        if book_id in described_books:
+            print(f"✅ Updated description for book {db_number}")
+            pending_updates += 1
+        else:
+            print(f"✅ Inserted new description for book {db_number}")
+            described_books.add(book_id)
+        
+        # Print some sample data to verify hyperlinks
+        for col, value in list(data.items())[:2]:
+            if '<a href=' in str(value):
+                print(f"   📎 {col}: {value[:100]}...")
         
         processed_count += 1
 
+        if len(pending) >= BATCH_SIZE:
+            if flush_descriptions(conn, cursor, pending):
+                inserted_count += len(pending) - pending_updates
+                updated_count += pending_updates
+            pending.clear()
+            pending_updates = 0
+
+    if pending and flush_descriptions(conn, cursor, pending):
+        inserted_count += len(pending) - pending_updates
+        updated_count += pending_updates
+
     conn.commit()
     conn.close()
     
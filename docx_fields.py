@@ -0,0 +1,183 @@
+import posixpath
+import re
+import zipfile
+
+from docx.oxml.shared import qn
+from lxml import etree
+
+# Clark-notation names resolved once instead of per run
+W_BODY = qn('w:body')
+W_P = qn('w:p')
+W_R = qn('w:r')
+W_HYPERLINK = qn('w:hyperlink')
+W_T = qn('w:t')
+W_TAB = qn('w:tab')
+W_PTAB = qn('w:ptab')
+W_BR = qn('w:br')
+W_CR = qn('w:cr')
+W_NO_BREAK_HYPHEN = qn('w:noBreakHyphen')
+W_TYPE = qn('w:type')
+R_ID = qn('r:id')
+# Run content elements that carry text, as python-docx reads them for run.text
+RUN_TEXT_TAGS = (W_T, W_TAB, W_PTAB, W_BR, W_CR, W_NO_BREAK_HYPHEN)
+
+# DOCX packaging: the relationships tell where the main document part is
+RELS_TAG = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+# Parts come from user files: no entity expansion or network access
+XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+# Label-like line prefix ("Word words"). Only checked for lines with a ':' whose
+# prefix is not a known label, since any label-like line still ends the previous value.
+LABEL_HEAD_RE = re.compile(r"[A-ZÀ-ÿ][a-zà-ÿ ]+", re.IGNORECASE)
+
+
+def read_rels(docx_zip, part_name):
+    """Relationships of a package part, rId → (type, target), {} if it has none"""
+    rels_name = posixpath.join(posixpath.dirname(part_name), '_rels', posixpath.basename(part_name) + '.rels')
+    try:
+        root = etree.fromstring(docx_zip.read(rels_name), XML_PARSER)
+    except KeyError:
+        return {}
+    return {rel.get('Id'): (rel.get('Type'), rel.get('Target')) for rel in root.iter(RELS_TAG)}
+
+
+def run_text(run):
+    """Text of a w:r element, with tabs, breaks and hyphens as python-docx renders them"""
+    parts = []
+    for child in run.iterchildren(*RUN_TEXT_TAGS):
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append('\t')
+        elif tag == W_BR:
+            # Page and column breaks have no text
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == W_CR:
+            parts.append('\n')
+        else:
+            parts.append('-')
+    return ''.join(parts)
+
+
+def extract_hyperlinks_from_paragraph(paragraph, links):
+    """Extract the text of a w:p element preserving hyperlinks as HTML.
+
+    links maps the document's relationship ids to their targets.
+    Returns (text_with_links, plain_text), plain_text being what python-docx
+    gives as paragraph.text.
+    """
+    parts = []
+    plain_parts = []
+    has_link = False
+    # Runs and hyperlinks in document order, each emitted in place: no searching
+    # the plain text for where a link's text belongs
+    for child in paragraph.iterchildren(W_R, W_HYPERLINK):
+        if child.tag == W_HYPERLINK:
+            text = ''.join(run_text(run) for run in child.iterchildren(W_R))
+            plain_parts.append(text)
+            hyperlink_url = links.get(child.get(R_ID))
+            if hyperlink_url and text.strip():
+                parts.append(f'<a href="{hyperlink_url}" target="_blank">{text}</a>')
+                has_link = True
+                continue
+        else:
+            text = run_text(child)
+            plain_parts.append(text)
+        parts.append(text)
+
+    plain_text = ''.join(plain_parts)
+    if not has_link:
+        return plain_text.strip(), plain_text
+    return ''.join(parts), plain_text
+
+
+def iter_docx_paragraphs(docx_path):
+    """Yield (text_with_links, plain_text) for each body paragraph of a DOCX.
+
+    Reads the zip directly and streams the main document part, without
+    building the python-docx object model (styles, numbering, settings...).
+    Like doc.paragraphs, only the paragraphs directly in the body are yielded.
+    """
+    with zipfile.ZipFile(docx_path) as docx_zip:
+        package_rels = read_rels(docx_zip, '')
+        document_part = next(
+            (target.lstrip('/') for rel_type, target in package_rels.values() if rel_type == OFFICE_DOCUMENT_REL),
+            'word/document.xml'
+        )
+        # Hyperlink targets by relationship id, as part.rels[rId].target_ref
+        links = {rel_id: target for rel_id, (_, target) in read_rels(docx_zip, document_part).items()}
+
+        with docx_zip.open(document_part) as document_xml:
+            for _, element in etree.iterparse(document_xml, events=('end',), tag=W_P,
+                                              resolve_entities=False, no_network=True):
+                parent = element.getparent()
+                if parent is not None and parent.tag == W_BODY:
+                    yield extract_hyperlinks_from_paragraph(element, links)
+                    # Done with it: keep memory bounded on long documents
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+
+def scan_fields(text, found, label_to_col):
+    """Collect "Label: value" fields from text into found (db column → raw value).
+
+    label_to_col maps lowercased labels to DB columns. A line opens a field
+    when its text before the first ':' is a known label; the value runs until
+    the next label-like line. Fields already in found keep their first
+    occurrence, and scanning stops once every field is matched.
+    """
+    db_col = None
+    value_lines = []
+    for line in text.split("\n"):
+        head, sep, rest = line.partition(":")
+        if not sep:
+            if db_col:
+                value_lines.append(line)
+            continue
+        label_col = label_to_col.get(head.lower())
+        if label_col is None and not LABEL_HEAD_RE.fullmatch(head):
+            if db_col:
+                value_lines.append(line)
+            continue
+        # A label-like line ends the open field
+        if db_col:
+            value = "\n".join(value_lines)
+            if value.strip():
+                found[db_col] = value
+                if len(found) == len(label_to_col):
+                    return
+        db_col = label_col if label_col not in found else None
+        value_lines = [rest]
+    if db_col:
+        value = "\n".join(value_lines)
+        if value.strip():
+            found[db_col] = value
+
+
+def read_fields(docx_path, label_to_col):
+    """Raw fields of a description DOCX, db column → value as written in the file.
+
+    Fields are first looked up in the text with hyperlinks kept as HTML; the
+    ones still missing are then looked up in the plain text.
+    """
+    # Text with hyperlinks and plain text, in one pass over the non-empty
+    # paragraphs, each paragraph's XML walked only once
+    link_parts = []
+    plain_parts = []
+    for text_with_links, text in iter_docx_paragraphs(docx_path):
+        text = text.strip()
+        if text:
+            link_parts.append(text_with_links)
+            link_parts.append("\n")
+            plain_parts.append(text)
+
+    found = {}
+    scan_fields("".join(link_parts), found, label_to_col)
+    if len(found) < len(label_to_col):
+        # The plain text is only built when the fallback is needed
+        scan_fields("\n".join(plain_parts), found, label_to_col)
+    return found
@@ -1,15 +1,25 @@
+import functools
 import os
 import sys
-from docx import Document
-from docx.oxml.shared import qn
+from concurrent.futures import ProcessPoolExecutor
 import re
 import sqlite3
-from typing import Any
+
+from docx_fields import read_fields
 
 db_dir = "books/collections.db"
 desc_dir = "books/descriptions"
 books_dir = "books"
 
+# SQLite settings for the description import: WAL journal, fsync only at
+# checkpoints, temp tables in memory, and a 64MB page cache
+BULK_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+)
+
 
 FIELD_MAP = {
     "Autore": "author",
@@ -37,6 +47,27 @@ FIELD_MAP = {
 CINQUECENTINE_COLLECTION_ID = 4
 INCUNABOLI_COLLECTION_ID = 3
 
+# Every description column, in FIELD_MAP order
+DESCRIPTION_COLS = tuple(db_col for db_col in FIELD_MAP.values() if db_col)
+# Built once so sqlite3 reuses the same prepared statements for every file.
+# COALESCE keeps the stored value of columns missing from a file on update.
+INSERT_DESCRIPTION_SQL = (
+    f"INSERT INTO book_descriptions (book_id, collection_id, number, language, {', '.join(DESCRIPTION_COLS)}) "
+    f"VALUES ({', '.join('?' for _ in range(4 + len(DESCRIPTION_COLS)))})"
+)
+UPDATE_DESCRIPTION_SQL = (
+    f"UPDATE book_descriptions SET {', '.join(f'{col} = COALESCE(?, {col})' for col in DESCRIPTION_COLS)} "
+    f"WHERE book_id = ? AND language = 'it'"
+)
+
+# === PRECOMPILED PATTERNS ===
+# Label (lowercased) → DB column, for docx_fields.scan_fields
+LABEL_TO_COL = {key.lower(): db_col for key, db_col in FIELD_MAP.items() if db_col}
+FILENAME_RE = re.compile(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA')
+EMPTY_A_RE = re.compile(r'<a\s+href="([^"]*)"[^>]*>\s*</a>')
+# Stripped from both ends of a book number by normalize_book_number
+DIGITS = "0123456789"
+
 def show_menu():
     print("\n" + "=" * 60)
     print("Book Agent - What would you like to do?")
@@ -49,6 +80,30 @@ def show_menu():
     print("6. Exit")
     print()
 
+def book_folders():
+    """Return (name, path) for every book folder in books_dir, in one directory scan"""
+    with os.scandir(books_dir) as it:
+        return [(entry.name, entry.path) for entry in it
+                if entry.is_dir() and entry.name != "descriptions"]
+
+def iter_books(folders):
+    """Yield (name, jpg_count, has_manifest, has_viewer) per book folder, reading each folder once"""
+    for name, path in folders:
+        jpg_count = 0
+        has_manifest = has_viewer = False
+        with os.scandir(path) as it:
+            for entry in it:
+                f = entry.name
+                # Images are the bulk of every folder, so they are tested first;
+                # the other checks stop running once their file has been seen
+                if f.lower().endswith(('.jpg', '.jpeg')):
+                    jpg_count += 1
+                elif not has_manifest and f == 'manifest.json':
+                    has_manifest = True
+                elif not has_viewer and f.startswith('Viewer') and f.endswith('.js'):
+                    has_viewer = True
+        yield name, jpg_count, has_manifest, has_viewer
+
 def list_books():
     """Show all book folders"""
     
@@ -57,28 +112,21 @@ def list_books():
         print(f"   Current directory: {os.getcwd()}")
         return
     
-    folders = [d for d in os.listdir(books_dir) 
-               if os.path.isdir(os.path.join(books_dir, d)) and d != "descriptions"]
+    folders = book_folders()
     
     if not folders:
         print(f"\n📁 No book folders found in '{books_dir}'")
         return
     
     print(f"\n📚 Found {len(folders)} book folder(s) in '{books_dir}':")
-    for i, folder in enumerate(folders, 1):
-        path = os.path.join(books_dir, folder)
-        files = os.listdir(path)
-        jpg_count = len([f for f in files if f.endswith('.jpg')])
-        has_manifest = 'manifest.json' in files
-        has_viewer = any(f.startswith('Viewer') and f.endswith('.js') for f in files)
-        
+    for i, (folder, jpg_count, has_manifest, has_viewer) in enumerate(iter_books(folders), 1):
         status = "✅ PROCESSED" if (has_manifest and has_viewer) else "⏳ NOT PROCESSED"
         print(f"  {i}. {folder:<20} {status}  ({jpg_count} images)")
 
 def determine_collection_from_filename(filename):
     """Determine which collection this file belongs to based on the number"""
     # Extract number from filename
-    match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
+    match = FILENAME_RE.search(filename)
     if not match:
         return None, None
     
@@ -94,139 +142,24 @@ def determine_collection_from_filename(filename):
     
     return None, None
 
-def extract_hyperlinks_from_paragraph(paragraph):
-    """Extract paragraph text while preserving hyperlinks as HTML.
-    
-    This handles multiple Word hyperlink structures:
-    1. Hyperlinks as run parents (standard)
-    2. Hyperlinks in paragraph XML (some Word versions)
-    """
-    parts = []
-    
-    # Method 1: Check each run's parent for hyperlink
-    for run in paragraph.runs:
-        run_parent = run._element.getparent()
-        if run_parent is not None and run_parent.tag is not None and run_parent.tag.endswith('hyperlink'):
-            rel_id = run_parent.get(qn('r:id'))
-            hyperlink_url = None
-            if rel_id and rel_id in paragraph.part.rels:
-                hyperlink_url = paragraph.part.rels[rel_id].target_ref
-
-            run_text = run.text or ''
-            if hyperlink_url and run_text.strip():
-                parts.append(f'<a href="{hyperlink_url}" target="_blank">{run_text}</a>')
-            else:
-                parts.append(run_text)
-        else:
-            parts.append(run.text or '')
-
-    joined = ''.join(parts)
-
-    # Method 2: If no hyperlinks found in runs, check paragraph XML directly
-    if '<a href=' not in joined:
-        try:
-            # Get paragraph XML
-            para_xml = paragraph._element.xml
-            if isinstance(para_xml, bytes):
-                para_xml = para_xml.decode('utf-8')
-            else:
-                para_xml = str(para_xml)
-            
-            # Check if there are hyperlinks in the XML
-            if '<w:hyperlink' in para_xml or 'hyperlink' in para_xml.lower():
-                # Extract hyperlink elements with their rIds
-                import re
-                
-                # Find all w:hyperlink elements with their r:id
-                hyperlink_pattern = r'<w:hyperlink[^>]*r:id="([^"]+)"[^>]*>(.*?)</w:hyperlink>'
-                hyperlink_matches = re.findall(hyperlink_pattern, para_xml, re.DOTALL)
-                
-                if hyperlink_matches:
-                    # We found hyperlinks in the XML, need to reconstruct text with links
-                    result_parts = []
-                    last_pos = 0
-                    
-                    # Get plain text to know the structure
-                    plain_text = paragraph.text
-                    
-                    for rel_id, hyperlink_content in hyperlink_matches:
-                        # Extract the text from the hyperlink content
-                        text_matches = re.findall(r'<w:t[^>]*>([^<]+)</w:t>', hyperlink_content)
-                        link_text = ''.join(text_matches)
-                        
-                        # Try to get the URL from relationships
-                        try:
-                            if rel_id in paragraph.part.rels:
-                                url = paragraph.part.rels[rel_id].target_ref
-                                
-                                # Find where this text appears in the plain text
-                                if link_text in plain_text[last_pos:]:
-                                    pos = plain_text.find(link_text, last_pos)
-                                    # Add text before the link
-                                    if pos > last_pos:
-                                        result_parts.append(plain_text[last_pos:pos])
-                                    # Add the link
-                                    result_parts.append(f'<a href="{url}" target="_blank">{link_text}</a>')
-                                    last_pos = pos + len(link_text)
-                        except:
-                            # If we can't resolve the URL, just add the text
-                            result_parts.append(link_text)
-                    
-                    # Add any remaining text
-                    if last_pos < len(plain_text):
-                        result_parts.append(plain_text[last_pos:])
-                    
-                    joined = ''.join(result_parts)
-        
-        except Exception as e:
-            # If XML parsing fails, fall back to plain text
-            pass
-
-    # If there were no hyperlinks, fall back to the simple paragraph text
-    if '<a href=' not in joined:
-        return (paragraph.text or '').strip()
-
-    return joined
-
 def extract_data_from_docx(docx_path):
-    doc = Document(docx_path)
-    
-    # Extract text with hyperlinks preserved
-    full_text_with_links = ""
-    paragraph_texts = []
-    
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            # Try to extract with hyperlinks
-            text_with_links = extract_hyperlinks_from_paragraph(paragraph)
-            paragraph_texts.append(text_with_links)
-            full_text_with_links += text_with_links + "\n"
-    
-    # Also get plain text for regex matching (fallback)
-    plain_text = "\n".join([p.text.strip() for p in doc.paragraphs if p.text.strip()])
+    # Fields with hyperlinks kept as HTML, missing ones filled from the plain text
+    found = read_fields(docx_path, LABEL_TO_COL)
     
     data = {}
-    for key, db_col in FIELD_MAP.items():
-        if not db_col:
-            continue
-        
-        # First try to find the field in text with links
-        match = re.search(rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zÀ-ÿ ]+?:|\Z)", full_text_with_links, re.DOTALL | re.IGNORECASE)
-        
-        # If not found, try plain text
-        if not match:
-            match = re.search(rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zÀ-ÿ ]+?:|\Z)", plain_text, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            value = match.group(1).strip()
-            # Clean up whitespace but preserve HTML tags
-            value = re.sub(r'\s+', ' ', value)
+    # Emit fields in FIELD_MAP order
+    for db_col in LABEL_TO_COL.values():
+        if db_col in found:
+            # Strip and collapse whitespace (str.split, no regex) but preserve HTML tags
+            value = ' '.join(found[db_col].split())
             # Clean up any malformed HTML
-            value = re.sub(r'<a\s+href="([^"]*)"[^>]*>\s*</a>', '', value)  # Remove empty links
+            if '<a' in value:
+                value = EMPTY_A_RE.sub('', value)  # Remove empty links
             data[db_col] = value
             
     return data
 
+@functools.lru_cache(maxsize=8192)
 def normalize_book_number(number):
     """Normalize book number to handle different formats like 5A01 vs 5A1"""
     if not number:
@@ -235,41 +168,49 @@ def normalize_book_number(number):
     # Remove any extra spaces and convert to uppercase
     number = str(number).strip().upper()
     
-    # Handle patterns like 5A01 -> 5A1 (remove leading zero in the number part)
-    match = re.match(r'^(\d+)([A-Z]+)(\d+)$', number)
-    if match:
-        prefix, letter, num = match.groups()
+    # Handle patterns like 5A01 -> 5A1 (remove leading zero in the number part):
+    # digits, then A-Z letters, then digits, split with str.rstrip/lstrip
+    head = number.rstrip(DIGITS)
+    letters = head.lstrip(DIGITS)
+    if letters and len(letters) < len(head) < len(number) and letters.isalpha() and letters.isascii():
         # Remove leading zeros from the number part
-        normalized_num = str(int(num))
-        return f"{prefix}{letter}{normalized_num}"
+        return f"{head}{int(number[len(head):])}"
     
     return number
 
-def find_or_create_book(cursor, file_number, collection_id, author=None):
+def build_book_index(cursor):
+    """Load all books once and index them for file-number lookups.
+
+    Returns two dicts keyed by (collection_id, number): one on the uppercased
+    number for exact matches and one on the normalized number (5A01 == 5A1).
+    """
+    cursor.execute("SELECT book_id, number, collection_id FROM books")
+    exact_index = {}
+    normalized_index = {}
+    for book_id, db_number, collection_id in cursor.fetchall():
+        if db_number is None:
+            continue
+        # First row wins, like the per-file queries this replaces
+        exact_index.setdefault((collection_id, str(db_number).upper()), (book_id, db_number))
+        normalized_index.setdefault((collection_id, normalize_book_number(db_number)), (book_id, db_number))
+    return exact_index, normalized_index
+
+def find_or_create_book(cursor, book_index, file_number, collection_id, author=None):
     """Find a book in the specified collection that matches the file number, or create it if not found"""
+    exact_index, normalized_index = book_index
     
     # Normalize the file number
     normalized_file_number = normalize_book_number(file_number)
     
     # Try to find exact match first
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ? AND UPPER(number) = ?", 
-        (collection_id, file_number.upper())
-    )
-    result = cursor.fetchone()
+    result = exact_index.get((collection_id, file_number.upper()))
     if result:
         return result, "found"
     
     # Try normalized match
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ?", 
-        (collection_id,)
-    )
-    books = cursor.fetchall()
-    
-    for book_id, db_number in books:
-        if normalize_book_number(db_number) == normalized_file_number:
-            return (book_id, db_number), "found"
+    result = normalized_index.get((collection_id, normalized_file_number))
+    if result:
+        return result, "found"
     
     # Book not found - create it
     print(f"   📝 Creating new book: {file_number} in database")
@@ -287,57 +228,74 @@ def find_or_create_book(cursor, file_number, collection_id, author=None):
         cursor.execute(sql, list(insert_data.values()))
         book_id = cursor.lastrowid
         
+        # Later files for the same number must find this book
+        exact_index[(collection_id, file_number.upper())] = (book_id, file_number)
+        normalized_index[(collection_id, normalized_file_number)] = (book_id, file_number)
+        
         return (book_id, file_number), "created"
     except Exception as e:
         return None, f"error: {str(e)}"
 
-def insert_or_update_description(cursor, book_id, collection_id, book_number, data):
-    """Insert or update book description in the book_descriptions table"""
+def insert_or_update_description(described_books, insert_rows, update_rows, book_id, collection_id, book_number, data):
+    """Queue the insert or update of a book description for the batched write.
+
+    described_books holds the book_ids that already have (or will have) an
+    Italian description; the queued rows are written by write_descriptions.
+    """
+    # Every description column in a fixed order, None where nothing was extracted;
+    # store values as strings to preserve the HTML
+    values = [str(data[col]) if data.get(col) else None for col in DESCRIPTION_COLS]
     
-    # Check if description already exists
-    cursor.execute(
-        "SELECT description_id FROM book_descriptions WHERE book_id = ? AND language = 'it'",
-        (book_id,)
-    )
-    existing = cursor.fetchone()
-    
-    # Prepare full data including required fields
-    full_data = {
-        'book_id': book_id,
-        'collection_id': collection_id,
-        'number': book_number,
-        'language': 'it',
-        **data  # Add extracted description data
-    }
-    
-    if existing:
+    if book_id in described_books:
         # Update existing description
-        description_id = existing[0]
-        set_clauses = []
-        values = []
-        
-        for key, value in data.items():
-            # Ensure we're storing the full text with HTML tags
-            if value:
-                set_clauses.append(f"{key} = ?")
-                values.append(str(value))  # Convert to string to preserve HTML
-        
-        if set_clauses:
-            values.append(description_id)
-            sql = f"UPDATE book_descriptions SET {', '.join(set_clauses)} WHERE description_id = ?"
-            cursor.execute(sql, values)
-            return "updated"
-        return "no_changes"
+        if not any(values):
+            return "no_changes"
+        update_rows.append((*values, book_id))
+        return "updated"
     else:
-        # Insert new description - make sure all values are strings
-        clean_data = {k: str(v) if v else None for k, v in full_data.items()}
-        columns = list(clean_data.keys())
-        placeholders = ['?' for _ in columns]
-        
-        sql = f"INSERT INTO book_descriptions ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(sql, list(clean_data.values()))
+        # Insert new description
+        insert_rows.append((book_id, collection_id, book_number, 'it', *values))
+        described_books.add(book_id)
         return "inserted"
 
+def write_descriptions(cursor, insert_rows, update_rows):
+    """Write the queued descriptions with one executemany per statement.
+
+    Inserts go first so that a later file for the same book updates the row
+    inserted earlier in the run, as it did when each file was written directly.
+    """
+    cursor.executemany(INSERT_DESCRIPTION_SQL, insert_rows)
+    cursor.executemany(UPDATE_DESCRIPTION_SQL, update_rows)
+
+def verify_hyperlinks(cursor, stored_links):
+    """Check that fields written with hyperlinks still contain them in the DB.
+
+    stored_links maps book_id → (number, fields); the rows are read back with one
+    query per chunk of books instead of one query per processed file.
+    """
+    columns = sorted({field for _, fields in stored_links.values() for field in fields})
+    book_ids = list(stored_links)
+    
+    print("🔎 Verifying stored hyperlinks...")
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(book_ids), 500):
+        chunk = book_ids[start:start + 500]
+        cursor.execute(
+            f"SELECT book_id, {', '.join(columns)} FROM book_descriptions "
+            f"WHERE language = 'it' AND book_id IN ({', '.join('?' for _ in chunk)})",
+            chunk
+        )
+        for book_id, *db_values in cursor.fetchall():
+            stored = dict(zip(columns, db_values))
+            db_number, fields = stored_links[book_id]
+            for field in fields:
+                if stored[field] and '<a href=' in str(stored[field]):
+                    print(f"   ✓ {db_number}: verified '{field}' contains hyperlinks in DB")
+                else:
+                    print(f"   ⚠️  WARNING: {db_number}: '{field}' hyperlinks may not be stored correctly!")
+                    print(f"      Stored value: {str(stored[field])[:100]}")
+    print()
+
 def update_db_from_docx():
     """Update database from Word documents"""
     print("\n" + "=" * 60)
@@ -354,6 +312,8 @@ def update_db_from_docx():
     
     conn = sqlite3.connect(db_dir)
     cursor = conn.cursor()
+    for pragma in BULK_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
 
     # Check if book_descriptions table exists
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'")
@@ -385,13 +345,30 @@ def update_db_from_docx():
     books_created_count = 0
     not_found_count = 0
 
-    docx_files = [f for f in os.listdir(desc_dir) if f.endswith((".docx", ".doc"))]
+    # "~$..." files are Word's lock files for open documents, not descriptions
+    with os.scandir(desc_dir) as it:
+        docx_files = [entry.name for entry in it
+                      if entry.is_file() and entry.name.endswith(".docx") and not entry.name.startswith("~$")]
     print(f"\n📄 Found {len(docx_files)} Word document(s) to process")
     print()
 
+    # Books are looked up in memory rather than queried per file
+    book_index = build_book_index(cursor)
+    # book_id → (number, fields written with hyperlinks), checked once at the end
+    stored_links = {}
+    # Books that already have a description, to queue inserts vs updates
+    cursor.execute("SELECT book_id FROM book_descriptions WHERE language = 'it'")
+    described_books = {row[0] for row in cursor.fetchall()}
+    insert_rows = []
+    update_rows = []
+
+    # One explicit transaction for every book and description written below;
+    # if the run dies before the commit, nothing is left half-written
+    cursor.execute("BEGIN")
+
     for filename in docx_files:
         # Extract number and determine collection
-        match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
+        match = FILENAME_RE.search(filename)
         if not match:
             print(f"❌ Could not extract number from: {filename}")
             continue
@@ -422,7 +399,7 @@ def update_db_from_docx():
         
         # Find or create book in database
         author = data.get('author', 'Unknown')
-        book_result = find_or_create_book(cursor, file_number, collection_id, author)
+        book_result = find_or_create_book(cursor, book_index, file_number, collection_id, author)
         
         if book_result[1].startswith("error"):
             print(f"   ❌ Error: {book_result[1]}")
@@ -444,51 +421,50 @@ def update_db_from_docx():
         else:
             print(f"   ✅ Found book: {db_number} (ID: {book_id})")
 
-        # Insert or update description
-        try:
-            action = insert_or_update_description(cursor, book_id, collection_id, db_number, data)
-            if action == "updated":
-                print(f"   ✅ Updated description")
-                updated_count += 1
-            elif action == "inserted":
-                print(f"   ✅ Inserted description")
-                inserted_count += 1
-            else:
-                print(f"   ℹ️  No changes needed")
-            
-            # Verify and show what was actually stored
-            hyperlink_fields = []
-            for col, value in data.items():
-                if value and '<a href=' in str(value):
-                    hyperlink_fields.append(col)
-                    # Show a preview
-                    preview = str(value)[:150]
-                    print(f"   📎 Stored with hyperlinks in '{col}': {preview}...")
-            
-            if hyperlink_fields:
-                # Verify it's actually in the database
-                cursor.execute(
-                    f"SELECT {', '.join(hyperlink_fields)} FROM book_descriptions WHERE book_id = ?",
-                    (book_id,)
-                )
-                db_values = cursor.fetchone()
-                if db_values:
-                    for i, field in enumerate(hyperlink_fields):
-                        if db_values[i] and '<a href=' in str(db_values[i]):
-                            print(f"   ✓ Verified '{field}' contains hyperlinks in DB")
-                        else:
-                            print(f"   ⚠️  WARNING: '{field}' hyperlinks may not be stored correctly!")
-                            print(f"      Stored value: {str(db_values[i])[:100]}")
-                            
-        except sqlite3.Error as e:
-            print(f"   ❌ Database error: {e}")
-            import traceback
-            traceback.print_exc()
+        # Insert or update description; rows are written in one batch after the loop
+        action = insert_or_update_description(
+            described_books, insert_rows, update_rows, book_id, collection_id, db_number, data
+        )
+        if action == "updated":
+            print(f"   ✅ Updated description")
+            updated_count += 1
+        elif action == "inserted":
+            print(f"   ✅ Inserted description")
+            inserted_count += 1
+        else:
+            print(f"   ℹ️  No changes needed")
+        
+        # Show what was stored; it is verified against the DB after the commit
+        hyperlink_fields = []
+        for col, value in data.items():
+            if value and '<a href=' in str(value):
+                hyperlink_fields.append(col)
+                # Show a preview
+                preview = str(value)[:150]
+                print(f"   📎 Stored with hyperlinks in '{col}': {preview}...")
+        
+        if hyperlink_fields:
+            stored_links[book_id] = (db_number, hyperlink_fields)
         
         processed_count += 1
         print()
 
+    # A failing batch is undone on its own; the created books are kept
+    cursor.execute("SAVEPOINT descriptions")
+    try:
+        write_descriptions(cursor, insert_rows, update_rows)
+    except sqlite3.Error as e:
+        print(f"   ❌ Database error while writing descriptions: {e}")
+        import traceback
+        traceback.print_exc()
+        cursor.execute("ROLLBACK TO descriptions")
+        inserted_count = updated_count = 0
+        stored_links.clear()
+    cursor.execute("RELEASE descriptions")
+
     conn.commit()
+    if stored_links:
+        verify_hyperlinks(cursor, stored_links)
     conn.close()
     
     print("=" * 60)
@@ -503,14 +479,13 @@ def update_db_from_docx():
 
 def process_all():
     """Process all book folders"""
-    from generator import process_book_folder
+    from generator import get_authors_from_database, process_book_folder
     
     if not os.path.exists(books_dir):
         print(f"\n❌ '{books_dir}' folder doesn't exist!")
         return
     
-    folders = [d for d in os.listdir(books_dir) 
-               if os.path.isdir(os.path.join(books_dir, d)) and d != "descriptions"]
+    folders = book_folders()
     
     if not folders:
         print(f"\n⚠️  No book folders found!")
@@ -522,17 +497,22 @@ def process_all():
     success_count = 0
     error_count = 0
     
-    for folder in folders:
-        path = os.path.join(books_dir, folder)
-        print(f"\n📖 {folder}...")
-        
-        try:
-            process_book_folder(path)
-            print(f"   ✅ Success")
-            success_count += 1
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            error_count += 1
+    # One batched author lookup for every folder instead of one per book
+    authors = get_authors_from_database([folder for folder, _ in folders])
+    
+    # Folders are independent, so they are processed in parallel; results are
+    # reported in folder order as they are collected
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [(folder, executor.submit(process_book_folder, path, author=authors[folder]))
+                   for folder, path in folders]
+        for folder, future in futures:
+            try:
+                future.result()
+                print(f"\n📖 {folder}... ✅ Success")
+                success_count += 1
+            except Exception as e:
+                print(f"\n📖 {folder}... ❌ Error: {e}")
+                error_count += 1
     
     print("\n" + "=" * 60)
     print(f"✅ Successfully processed: {success_count}")
@@ -546,12 +526,11 @@ def process_one():
     
     # Show available folders
     if os.path.exists(books_dir):
-        folders = [d for d in os.listdir(books_dir) 
-                   if os.path.isdir(os.path.join(books_dir, d)) and d != "descriptions"]
+        folders = book_folders()
         
         if folders:
             print("\nAvailable book folders:")
-            for folder in folders:
+            for folder, _ in folders:
                 print(f"  - {folder}")
     
     print("\nEnter the book folder name (e.g., '5d23'):")
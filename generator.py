@@ -1,75 +1,220 @@
+import functools
 import os
 import json
 import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from viewer_template import make_valid_identifier, render_viewer_js
+
+try:
+    import orjson
+except ImportError:  # optional: much faster manifest encoding when installed
+    orjson = None
+
+# Runs of characters not allowed in the author part of a URL
+SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+# Page image extensions, matched case-insensitively (.jpg, .JPG, .jpeg)
+IMAGE_SUFFIXES = ('.jpg', '.jpeg')
+
+# Per-folder state at the last successful run of process_all_books, kept in the books root
+PROCESSED_CACHE = ".book_agent_cache"
+
+def dumps_manifest(manifest):
+    """Encode a manifest to UTF-8 JSON bytes, with orjson when it is available
+
+    Both encoders write the same bytes (2-space indent, non-ASCII kept), so a
+    manifest does not change just because orjson was installed or removed.
+    """
+    if orjson is not None:
+        return orjson.dumps(manifest, option=orjson.OPT_INDENT_2)
+    return json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
 
 def strip_html_tags(text):
     """Remove HTML tags from text while preserving the content"""
     if not text:
         return text
-    clean_text = re.sub(r'<[^>]+>', '', text)
-    return clean_text.strip()
+    if '<' not in text:
+        return text.strip()
+    # Single pass: copy the text between tags, jumping from each '<' to its
+    # closing '>' (a lone '<' or an empty '<>' is kept, as plain text)
+    parts = []
+    pos = 0
+    start = text.find('<')
+    while start != -1:
+        end = text.find('>', start + 1)
+        if end == -1:
+            break
+        if end == start + 1:
+            start = text.find('<', end)
+            continue
+        parts.append(text[pos:start])
+        pos = end + 1
+        start = text.find('<', pos)
+    parts.append(text[pos:])
+    return ''.join(parts).strip()
 
-def get_author_from_database(book_id, db_path="books/collections.db"):
-    """Get author name from database based on book ID (number)"""
-    try:
+def clean_author(author):
+    """Author name for display: no HTML, no trailing dates or notes"""
+    # Strip HTML tags
+    author = strip_html_tags(author)
+    # Clean up extra info (dates, etc.): keep what comes before the first '<' or '('
+    cut = min((i for i in (author.find('<'), author.find('(')) if i >= 0), default=len(author))
+    author = author[:cut].strip().rstrip('.,;')
+    return author if author else "Unknown Author"
+
+# Read-only tuning for the author lookups, applied once per connection.
+# busy_timeout comes first so the others wait out a writer's lock; the
+# journal mode is left to the writers (changing it needs a write lock).
+AUTHOR_DB_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA query_only=1",
+)
+
+# Cached connections by database path. They are kept per thread (the watcher
+# and the MCP server call in from worker threads) and per process (pool
+# workers must not reuse a handle inherited across fork).
+_local = threading.local()
+
+def _get_conn(db_path="books/collections.db"):
+    """Cached, read-only tuned connection to the collections database"""
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conns = {}
+    conn = _local.conns.get(db_path)
+    if conn is None:
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Try to get author from book_descriptions first (has HTML)
-        cursor.execute("""
-            SELECT author FROM book_descriptions 
-            WHERE number = ? AND language = 'it'
-            LIMIT 1
-        """, (book_id.upper(),))
-        
-        result = cursor.fetchone()
-        if result and result[0]:
-            author = result[0]
-            # Strip HTML tags
-            author = strip_html_tags(author)
-            # Clean up extra info (dates, etc.)
-            author = re.split(r'[<\(]', author)[0].strip()
-            author = author.rstrip('.,;')
-            conn.close()
-            return author if author else "Unknown Author"
-        
-        # Fallback: try books table
-        cursor.execute("""
-            SELECT author FROM books 
-            WHERE number = ?
-            LIMIT 1
-        """, (book_id.upper(),))
-        
-        result = cursor.fetchone()
+        for pragma in AUTHOR_DB_PRAGMAS:
+            conn.execute(pragma)
+        _local.conns[db_path] = conn
+    return conn
+
+def _drop_conn(db_path="books/collections.db"):
+    """Forget a cached connection after an error so the next call reconnects"""
+    conn = getattr(_local, 'conns', {}).pop(db_path, None)
+    if conn is not None:
         conn.close()
+
+def get_authors_from_database(book_ids, db_path="books/collections.db"):
+    """Get author names for many book IDs (numbers) with one connection.
+
+    Returns a dict book_id → author. Each number is looked up in
+    book_descriptions first (has HTML), then in the books table, with one
+    IN query per table instead of one or two queries per book.
+    """
+    numbers = {book_id: book_id.upper() for book_id in book_ids}
+    try:
+        conn = _get_conn(db_path)
+        cursor = conn.cursor()
         
-        if result and result[0]:
-            author = result[0]
-            author = strip_html_tags(author)
-            author = re.split(r'[<\(]', author)[0].strip()
-            author = author.rstrip('.,;')
-            return author if author else "Unknown Author"
+        def first_authors(sql, wanted):
+            # First row per number, like the LIMIT 1 of a single lookup;
+            # chunked to stay below SQLite's bound-parameter limit
+            found = {}
+            wanted = list(wanted)
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                cursor.execute(sql.format(", ".join("?" for _ in chunk)), chunk)
+                for number, author in cursor.fetchall():
+                    found.setdefault(number, author)
+            return found
         
-        return "Unknown Author"
+        described = first_authors(
+            "SELECT number, author FROM book_descriptions WHERE language = 'it' AND number IN ({})",
+            set(numbers.values())
+        )
+        # Fallback: try books table for the numbers without a described author
+        missing = {number for number in numbers.values() if not described.get(number)}
+        listed = first_authors("SELECT number, author FROM books WHERE number IN ({})", missing) if missing else {}
         
     except Exception as e:
-        print(f"   ⚠️  Error getting author from database: {e}")
-        return "Unknown Author"
+        print(f"   ⚠️  Error getting authors from database: {e}")
+        _drop_conn(db_path)
+        return {book_id: "Unknown Author" for book_id in book_ids}
+    
+    authors = {}
+    for book_id, number in numbers.items():
+        author = described.get(number) or listed.get(number)
+        authors[book_id] = clean_author(author) if author else "Unknown Author"
+    return authors
+
+def get_author_from_database(book_id, db_path="books/collections.db"):
+    """Get author name from database based on book ID (number)"""
+    return get_authors_from_database([book_id], db_path)[book_id]
+
+@functools.lru_cache(maxsize=4096)
+def author_slug(author):
+    """URL-safe slug of an author name; authors repeat across books, so it is cached"""
+    slug = SLUG_RE.sub('-', author.lower()).strip('-')
+    if not slug or slug == 'unknown-author':
+        slug = "unknown"
+    return slug
+
+def collection_for_book(book_id):
+    """Collection URL slug for a book number: 4xx are incunaboli, everything else cinquecentine"""
+    return "incunaboli" if book_id.startswith('4') else "cinquecentine"
+
+def make_canvas(image_url_prefix, index, file_name):
+    """Build the IIIF canvas for one image of the book"""
+    canvas_id = f"{image_url_prefix}/canvas{index + 1}"
+    
+    # Extract label from filename: the part after the first '_', without extension
+    _, sep, label = file_name.partition('_')
+    if sep:
+        stem, dot, _ = label.rpartition('.')
+        if dot:
+            label = stem
+    else:
+        label = str(index + 1)
 
-def process_book_folder(book_folder):
-    """Process a book folder: get author from DB, generate manifest and JS viewer"""
+    return {
+        "@id": canvas_id,
+        "@type": "sc:Canvas",
+        "label": label,
+        "height": 3933,
+        "width": 2645,
+        "images": [
+            {
+                "@type": "oa:Annotation",
+                "motivation": "sc:painting",
+                "resource": {
+                    "@id": f"{image_url_prefix}/{file_name}",
+                    "@type": "dctypes:Image",
+                    "format": "image/jpeg",
+                    "height": 3933,
+                    "width": 2645
+                },
+                "on": canvas_id
+            }
+        ]
+    }
+
+def process_book_folder(book_folder, collection=None, author=None):
+    """Process a book folder: get author from DB, generate manifest and JS viewer
+
+    collection is the URL slug of the book's collection; by default it is
+    inferred from the book number (see collection_for_book). author can be
+    passed when it was already fetched with get_authors_from_database.
+    """
     print(f"⚙️ Processing {book_folder}...")
 
     # Get book ID (folder name)
     book_id = os.path.basename(book_folder)
 
     # Get author from database
-    author = get_author_from_database(book_id)
+    if author is None:
+        author = get_author_from_database(book_id)
     print(f"   📝 Author: {author}")
 
     # Get image files
-    image_files = sorted([f for f in os.listdir(book_folder) if f.endswith('.jpg')])
+    with os.scandir(book_folder) as it:
+        image_files = [entry.name for entry in it
+                       if entry.name.lower().endswith(IMAGE_SUFFIXES) and entry.is_file()]
+    image_files.sort()
     
     if not image_files:
         print(f"   ⚠️  No images found in {book_folder}")
@@ -77,12 +222,9 @@ def process_book_folder(book_folder):
     
     print(f"   🖼️  Found {len(image_files)} images")
     
-    # Create URL-safe author slug
-    author_slug = re.sub(r'[^a-z0-9]+', '-', author.lower()).strip('-')
-    if not author_slug or author_slug == 'unknown-author':
-        author_slug = "unknown"
-    
-    image_url_prefix = f"https://www.magic.unina.it/collections/cinquecentine/{book_id.lower()}-{author_slug}"
+    if collection is None:
+        collection = collection_for_book(book_id)
+    image_url_prefix = f"https://www.magic.unina.it/collections/{collection}/{book_id.lower()}-{author_slug(author)}"
 
     # Generate IIIF manifest
     manifest = {
@@ -109,39 +251,15 @@ def process_book_folder(book_folder):
     }
 
     # Generate canvases for each image
-    for index, file_name in enumerate(image_files):
-        canvas_id = f"{image_url_prefix}/canvas{index + 1}"
-        
-        # Extract label from filename
-        label = file_name.split('_', 1)[-1].rsplit('.', 1)[0] if '_' in file_name else str(index + 1)
-
-        canvas = {
-            "@id": canvas_id,
-            "@type": "sc:Canvas",
-            "label": label,
-            "height": 3933,
-            "width": 2645,
-            "images": [
-                {
-                    "@type": "oa:Annotation",
-                    "motivation": "sc:painting",
-                    "resource": {
-                        "@id": f"{image_url_prefix}/{file_name}",
-                        "@type": "dctypes:Image",
-                        "format": "image/jpeg",
-                        "height": 3933,
-                        "width": 2645
-                    },
-                    "on": canvas_id
-                }
-            ]
-        }
-        manifest["sequences"][0]["canvases"].append(canvas)
-
-    # Write manifest.json
+    manifest["sequences"][0]["canvases"] = [
+        make_canvas(image_url_prefix, index, file_name)
+        for index, file_name in enumerate(image_files)
+    ]
+
+    # Write manifest.json, encoded in one go and written with a single call
     manifest_path = os.path.join(book_folder, "manifest.json")
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    with open(manifest_path, "wb") as f:
+        f.write(dumps_manifest(manifest))
 
     print(f"   ✅ Manifest generated: {manifest_path}")
 
@@ -150,103 +268,130 @@ def process_book_folder(book_folder):
     
     print(f"   ✅ Processing complete for {book_id}")
 
+def folder_state(book_folder):
+    """[mtime_ns, image count] of a book folder, to tell whether it changed since the last run"""
+    with os.scandir(book_folder) as it:
+        image_count = sum(1 for entry in it if entry.name.lower().endswith(IMAGE_SUFFIXES))
+    return [os.stat(book_folder).st_mtime_ns, image_count]
+
+def processed_state(book_folder, author):
+    """Cache entry of a processed folder: its folder_state and the author it was built with
+
+    The author is part of it because the manifest and viewer depend on it: a
+    book whose author changed in the database is processed again even though
+    its folder did not change.
+    """
+    return folder_state(book_folder) + [author]
+
+def load_processed_cache(cache_path):
+    """State of every folder at its last successful processing, {} if there is no usable cache"""
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_processed_cache(cache_path, cache):
+    """Write the cache through a temporary file, so a reader never sees half of it"""
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+# Serializes the read-modify-write of PROCESSED_CACHE between threads
+_cache_lock = threading.Lock()
+
+def mark_processed(book_folder, author):
+    """Record one processed folder in the PROCESSED_CACHE of its books root
+
+    For the folders processed one at a time (see watcher.py), so the next
+    process_all_books does not process them again.
+    """
+    root, name = os.path.split(os.path.normpath(book_folder))
+    cache_path = os.path.join(root, PROCESSED_CACHE)
+    with _cache_lock:
+        cache = load_processed_cache(cache_path)
+        cache[name] = processed_state(book_folder, author)
+        save_processed_cache(cache_path, cache)
+
+def process_all_books(root="books", force=False):
+    """Process every new or changed book folder under root, several books at a time
+
+    Books are independent and the work is file and SQLite I/O, so threads are
+    enough. Authors are fetched for all books with one batched lookup first.
+    Folders whose mtime, image count and author match PROCESSED_CACHE from the
+    last run are skipped, unless force is set. Returns the number of book
+    folders processed.
+    """
+    with os.scandir(root) as it:
+        folders = sorted((entry.name, entry.path) for entry in it
+                         if entry.is_dir() and entry.name != "descriptions")
+    if not folders:
+        return 0
+    
+    # Fetched before the skip check: a changed author makes the book changed
+    authors = get_authors_from_database([name for name, _ in folders])
+    cache_path = os.path.join(root, PROCESSED_CACHE)
+    with _cache_lock:
+        cache = {} if force else load_processed_cache(cache_path)
+    changed = [(name, path) for name, path in folders
+               if cache.get(name) != processed_state(path, authors[name])]
+    if len(changed) < len(folders):
+        print(f"⏭️  Skipping {len(folders) - len(changed)} unchanged book folders")
+    if not changed:
+        return 0
+    
+    errors = []
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+        futures = [(name, path, executor.submit(process_book_folder, path, author=authors[name]))
+                   for name, path in changed]
+        for name, path, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            # Taken after processing: writing a first manifest changes the folder mtime
+            cache[name] = processed_state(path, authors[name])
+    
+    # Folders that are gone are dropped from the cache
+    cache = {name: cache[name] for name, _ in folders if name in cache}
+    with _cache_lock:
+        save_processed_cache(cache_path, cache)
+    
+    if errors:
+        raise errors[0]
+    return len(changed)
+
+def write_if_changed(path, data):
+    """Write bytes to path unless the file already holds exactly them; True if written
+
+    Rewriting an identical viewer file would still make the Next.js dev server
+    pick it up as changed and recompile.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
 def generate_js_file(folder, book_id, author, manifest_url):
     """Generate JavaScript viewer file with clean author name using correct template"""
     
     # Create safe component name (PascalCase)
-    import re
-    def make_valid_identifier(name):
-        # Replace hyphens and invalid characters with underscores
-        name = re.sub(r'\W|^(?=\d)', '_', name)
-        # Capitalize parts to make it PascalCase
-        parts = name.split('_')
-        return ''.join(part.capitalize() for part in parts if part)
-    
     component_name = 'Viewer' + make_valid_identifier(book_id)
     js_filename = f"{book_id.lower()}-viewer.js"
     js_path = os.path.join(folder, js_filename)
 
-    js_content = f"""'use client';
-import React from 'react';
-import dynamic from 'next/dynamic';
-
-const MiradorViewer = dynamic(
-  () => import('../../../components/MiradorWrapper'),
-  {{ ssr: false }}
-);
-
-function {component_name}() {{
-  return (
-    <div className="viewer-container" style={{{{
-      height: '100vh',
-      width: '100%',
-      margin: 0,
-      padding: 0,
-      overflow: 'hidden',
-      position: 'relative',
-      display: 'flex',
-      flexDirection: 'column'
-    }}}}>
-      <style jsx global>{{`
-        html, body {{
-          margin: 0;
-          padding: 0;
-          height: 100%;
-          overflow: hidden;
-        }}
-
-        #__next, main {{
-          height: 100%;
-          margin: 0;
-          padding: 0;
-        }}
-      `}}</style>
-
-      <MiradorViewer 
-        config={{{{
-          id: 'mirador-viewer-{book_id.lower()}',
-          selectedTheme: 'dark',
-          themes: {{
-            dark: {{
-              palette: {{
-                mode: 'dark',
-                primary: {{ main: '#262426' }},
-                secondary: {{ main: '#d9b991' }}
-              }}
-            }}
-          }},
-          windows: [
-            {{
-              loadedManifest: '{manifest_url}/manifest.json',
-              canvasIndex: 0
-            }}
-          ],
-          window: {{
-            allowClose: false,
-            allowMaximize: false,
-            allowFullscreen: true,
-            allowWindowSideBar: true,
-            sideBarOpenByDefault: false
-          }},
-          workspace: {{
-            showZoomControls: true,
-            type: 'mosaic'
-          }},
-          thumbnailNavigation: {{
-            defaultPosition: 'far-bottom',
-            displaySettings: true
-          }}
-        }}}}
-      />
-    </div>
-  );
-}}
-
-export default {component_name};
-"""
-
-    with open(js_path, "w", encoding="utf-8") as f:
-        f.write(js_content)
+    js_content = render_viewer_js(book_id, manifest_url).encode("utf-8")
+
+    if not write_if_changed(js_path, js_content):
+        print(f"   🧩 Viewer JS unchanged: {js_path}")
+        return
 
     print(f"   🧩 Viewer JS created: {js_path}")
     print(f"      Component: {component_name}")
@@ -1,63 +1,80 @@
-import os
-import json
-
-# Path to the images directory
-image_directory = 'books/cleaned books/Venezia-(Marciana)-IT-Z-54_CLEANED_NLM_strong_1761961878'
-# URL prefix for the images
-image_url_prefix = 'https://www.magic.unina.it/collections/illuminated-dante-project/venezia-marciana-it-z-54-bleed-through-strong'
-
-image_files = sorted([f for f in os.listdir(image_directory) if f.endswith('.png')])
-
-manifest = {
-    "@context": "http://iiif.io/api/presentation/2/context.json",
-    "@id": f"{image_url_prefix}/manifest.json",
-    "@type": "sc:Manifest",
-    "label": "venezia-marciana-it-z-54",
-    "sequences": [
-        {
-            "@type": "sc:Sequence",
-            "canvases": []
-        }
-    ]
-}
-
-def generate_canvas(file_name, index):
-    file_path = f"{image_url_prefix}/{file_name}"
-    canvas_id = f"{image_url_prefix}/canvas{index+1}"
-    
-    label = file_name.split('_')[1:-1]
-    label = "_".join(label).rsplit('.', 1)[0]
-    print(label)
-    
-    return {
-        "@id": canvas_id,
-        "@type": "sc:Canvas",
-        "label": label,
-        "height": 3420, 
-        "width": 2420,
-        "images": [
-            {
-                "@type": "oa:Annotation",
-                "motivation": "sc:painting",
-                "resource": {
-                    "@id": file_path,
-                    "@type": "dctypes:Image",
-                    "format": "image/png",
-                    "height": 3420,
-                    "width": 2420
-                },
-                "on": canvas_id
-            }
-        ]
-    }
-
-for index, image_file in enumerate(image_files):
-    print(f"Processing file: {image_file}")
-
-    manifest['sequences'][0]['canvases'].append(generate_canvas(image_file, index))
-
-output_file = os.path.join(image_directory, 'manifest.json')
-with open(output_file, 'w') as f:
-    json.dump(manifest, f, indent=4)
-
-print(f"Manifest file created at: {output_file}")
+import os
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: much faster manifest encoding when installed
+    orjson = None
+
+# Path to the images directory
+image_directory = 'books/cleaned books/Venezia-(Marciana)-IT-Z-54_CLEANED_NLM_strong_1761961878'
+# URL prefix for the images
+image_url_prefix = 'https://www.magic.unina.it/collections/illuminated-dante-project/venezia-marciana-it-z-54-bleed-through-strong'
+
+with os.scandir(image_directory) as it:
+    image_files = [entry.name for entry in it if entry.name.endswith('.png') and entry.is_file()]
+image_files.sort()
+
+manifest = {
+    "@context": "http://iiif.io/api/presentation/2/context.json",
+    "@id": f"{image_url_prefix}/manifest.json",
+    "@type": "sc:Manifest",
+    "label": "venezia-marciana-it-z-54",
+    "sequences": [
+        {
+            "@type": "sc:Sequence",
+            "canvases": []
+        }
+    ]
+}
+
+def generate_canvas(file_name, index):
+    print(f"Processing file: {file_name}")
+
+    file_path = f"{image_url_prefix}/{file_name}"
+    canvas_id = f"{image_url_prefix}/canvas{index+1}"
+    
+    # Label: what lies between the first and the last '_', without extension
+    label = file_name.partition('_')[2].rpartition('_')[0]
+    stem, dot, _ = label.rpartition('.')
+    if dot:
+        label = stem
+    print(label)
+    
+    return {
+        "@id": canvas_id,
+        "@type": "sc:Canvas",
+        "label": label,
+        "height": 3420, 
+        "width": 2420,
+        "images": [
+            {
+                "@type": "oa:Annotation",
+                "motivation": "sc:painting",
+                "resource": {
+                    "@id": file_path,
+                    "@type": "dctypes:Image",
+                    "format": "image/png",
+                    "height": 3420,
+                    "width": 2420
+                },
+                "on": canvas_id
+            }
+        ]
+    }
+
+manifest['sequences'][0]['canvases'] = [
+    generate_canvas(image_file, index) for index, image_file in enumerate(image_files)
+]
+
+output_file = os.path.join(image_directory, 'manifest.json')
+# Encoded in one go, with orjson when it is available; both write the same
+# bytes (2-space indent, non-ASCII kept) so the file does not depend on it
+if orjson is not None:
+    encoded = orjson.dumps(manifest, option=orjson.OPT_INDENT_2)
+else:
+    encoded = json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
+with open(output_file, 'wb') as f:
+    f.write(encoded)
+
+print(f"Manifest file created at: {output_file}")
@@ -1,19 +1,23 @@
 import asyncio
+import functools
+import multiprocessing
 import os
 import sqlite3
 import re
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any
-from docx import Document
-from docx.oxml.shared import qn
 
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 
 # Import your existing modules
+from docx_fields import read_fields
 from watcher import start_watching
-from generator import process_book_folder
+from generator import process_all_books
 
 # Initialize server
 server = Server("book-agent")
@@ -51,6 +55,42 @@ FIELD_MAP = {
     "Descrizione fisica": "physical_description",
 }
 
+# Every description column, in FIELD_MAP order
+DESCRIPTION_COLS = tuple(FIELD_MAP.values())
+# Built once so sqlite3 reuses the same prepared statements for every file.
+# COALESCE keeps the stored value of columns missing from a file on update.
+INSERT_DESCRIPTION_SQL = (
+    f"INSERT INTO book_descriptions (book_id, collection_id, number, language, {', '.join(DESCRIPTION_COLS)}) "
+    f"VALUES ({', '.join('?' for _ in range(4 + len(DESCRIPTION_COLS)))})"
+)
+INSERT_BOOK_SQL = "INSERT INTO books (collection_id, number, author) VALUES (?, ?, ?)"
+UPDATE_DESCRIPTION_SQL = (
+    f"UPDATE book_descriptions SET {', '.join(f'{col} = COALESCE(?, {col})' for col in DESCRIPTION_COLS)} "
+    f"WHERE description_id = (SELECT description_id FROM book_descriptions WHERE book_id = ? AND language = 'it' LIMIT 1)"
+)
+
+# === PRECOMPILED PATTERNS ===
+# Label (lowercased) → DB column, for docx_fields.scan_fields
+LABEL_TO_COL = {key.lower(): db_col for key, db_col in FIELD_MAP.items() if db_col}
+FILENAME_RE = re.compile(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA')
+EMPTY_A_RE = re.compile(r'<a\s+href="([^"]*)"[^>]*>\s*</a>')
+# Stripped from both ends of a book number by normalize_book_number
+DIGITS = "0123456789"
+
+# Bulk-import tuning for the description updater
+BULK_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+    "mmap_size=268435456",
+)
+
+# Open connections by database path, kept across tool calls. Calls run in
+# executor threads, so a connection is only used while holding _CONN_LOCK.
+_CONNS = {}
+_CONN_LOCK = threading.Lock()
+
 # Store paths in a mutable dict to avoid global declaration issues
 CONFIG = {
     "watch_path": WATCH_PATH,
@@ -61,22 +101,23 @@ CONFIG = {
 
 # ========== HELPER FUNCTIONS ==========
 
+@functools.lru_cache(maxsize=8192)
 def normalize_book_number(number: str) -> str:
     """Normalize book number (e.g., 5A01 -> 5A1)"""
     if not number:
         return ""
     number = str(number).strip().upper()
-    match = re.match(r'^(\d+)([A-Z]+)(\d+)$', number)
-    if match:
-        prefix, letter, num = match.groups()
-        normalized_num = str(int(num))
-        return f"{prefix}{letter}{normalized_num}"
+    # Digits, then A-Z letters, then digits, split with str.rstrip/lstrip
+    head = number.rstrip(DIGITS)
+    letters = head.lstrip(DIGITS)
+    if letters and len(letters) < len(head) < len(number) and letters.isalpha() and letters.isascii():
+        return f"{head}{int(number[len(head):])}"
     return number
 
 
 def determine_collection_from_filename(filename: str):
     """Determine collection ID from filename"""
-    match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
+    match = FILENAME_RE.search(filename)
     if not match:
         return None, None
     
@@ -90,174 +131,223 @@ def determine_collection_from_filename(filename: str):
     return None, None
 
 
-def extract_hyperlinks_from_paragraph(paragraph):
-    """Extract paragraph text preserving hyperlinks as HTML"""
-    parts = []
-    for run in paragraph.runs:
-        run_parent = run._element.getparent()
-        if run_parent is not None and run_parent.tag and run_parent.tag.endswith('hyperlink'):
-            rel_id = run_parent.get(qn('r:id'))
-            hyperlink_url = None
-            if rel_id and rel_id in paragraph.part.rels:
-                hyperlink_url = paragraph.part.rels[rel_id].target_ref
-            
-            run_text = run.text or ''
-            if hyperlink_url and run_text.strip():
-                parts.append(f'<a href="{hyperlink_url}" target="_blank">{run_text}</a>')
-            else:
-                parts.append(run_text)
-        else:
-            parts.append(run.text or '')
-    
-    joined = ''.join(parts)
-    if '<a href=' not in joined:
-        return (paragraph.text or '').strip()
-    return joined
-
-
-def extract_data_from_docx(docx_path: str) -> Dict[str, Any]:
-    """Extract structured data from DOCX file"""
-    doc = Document(docx_path)
+def extract_data_from_docx(docx_path: str):
+    """Extract structured data from DOCX file.
     
-    # Extract text with hyperlinks
-    full_text_with_links = ""
-    for paragraph in doc.paragraphs:
-        if paragraph.text.strip():
-            text_with_links = extract_hyperlinks_from_paragraph(paragraph)
-            full_text_with_links += text_with_links + "\n"
-    
-    # Plain text fallback
-    plain_text = "\n".join([p.text.strip() for p in doc.paragraphs if p.text.strip()])
+    Returns (data, has_hyperlinks), has_hyperlinks telling whether any stored
+    value kept a link.
+    """
+    # Fields with hyperlinks kept as HTML, missing ones filled from the plain text
+    found = read_fields(docx_path, LABEL_TO_COL)
     
     data = {}
-    for key, db_col in FIELD_MAP.items():
-        if not db_col:
-            continue
-        
-        # Try with links first
-        match = re.search(
-            rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zà-ÿ ]+?:|\Z)",
-            full_text_with_links,
-            re.DOTALL | re.IGNORECASE
-        )
-        
-        # Fallback to plain text
-        if not match:
-            match = re.search(
-                rf"{re.escape(key)}:\s*(.+?)(?=\n[A-ZÀ-ÿ][a-zà-ÿ ]+?:|\Z)",
-                plain_text,
-                re.DOTALL | re.IGNORECASE
-            )
-        
-        if match:
-            value = match.group(1).strip()
-            value = re.sub(r'\s+', ' ', value)
-            value = re.sub(r'<a\s+href="([^"]*)"[^>]*>\s*</a>', '', value)
+    has_hyperlinks = False
+    # Emit fields in FIELD_MAP order
+    for db_col in LABEL_TO_COL.values():
+        if db_col in found:
+            value = ' '.join(found[db_col].split())
+            # Only values with an anchor can hold an empty link
+            if '<a' in value:
+                value = EMPTY_A_RE.sub('', value)
+                has_hyperlinks = has_hyperlinks or '<a href=' in value
             data[db_col] = value
     
-    return data
+    return data, has_hyperlinks
 
 
-def find_or_create_book(cursor, file_number: str, collection_id: int, author: str = None):
+def extract_data_job(docx_path: str):
+    """Worker entry point: return (data, has_hyperlinks, None), or (None, False, error message) on failure"""
+    try:
+        return (*extract_data_from_docx(docx_path), None)
+    except Exception as e:
+        return None, False, str(e)
+
+
+def build_book_index(cursor):
+    """Load all books once, indexed by (collection_id, uppercased number) and
+    by (collection_id, normalized number) for the per-file lookups"""
+    cursor.execute("SELECT book_id, number, collection_id FROM books")
+    exact_index = {}
+    normalized_index = {}
+    for book_id, db_number, collection_id in cursor.fetchall():
+        if db_number is None:
+            continue
+        # First row wins, like the per-file queries this replaces
+        exact_index.setdefault((collection_id, str(db_number).upper()), (book_id, db_number))
+        normalized_index.setdefault((collection_id, normalize_book_number(db_number)), (book_id, db_number))
+    return exact_index, normalized_index
+
+
+def find_or_create_book(cursor, book_index, file_number: str, collection_id: int, author: str = None):
     """Find matching book in database, or create it if not found"""
+    exact_index, normalized_index = book_index
     normalized_file_number = normalize_book_number(file_number)
     
     # Try exact match
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ? AND UPPER(number) = ?",
-        (collection_id, file_number.upper())
-    )
-    result = cursor.fetchone()
+    result = exact_index.get((collection_id, file_number.upper()))
     if result:
         return result, "found"
     
     # Try normalized match
-    cursor.execute(
-        "SELECT book_id, number FROM books WHERE collection_id = ?",
-        (collection_id,)
-    )
-    books = cursor.fetchall()
-    
-    for book_id, db_number in books:
-        if normalize_book_number(db_number) == normalized_file_number:
-            return (book_id, db_number), "found"
+    result = normalized_index.get((collection_id, normalized_file_number))
+    if result:
+        return result, "found"
     
     # Book not found - create it
     try:
         # Insert new book
-        insert_data = {
-            'collection_id': collection_id,
-            'number': file_number,
-            'author': author or 'Unknown'
-        }
-        
-        columns = list(insert_data.keys())
-        placeholders = ['?' for _ in columns]
-        sql = f"INSERT INTO books ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        
-        cursor.execute(sql, list(insert_data.values()))
+        cursor.execute(INSERT_BOOK_SQL, (collection_id, file_number, author or 'Unknown'))
         book_id = cursor.lastrowid
         
+        # Later files for the same number must find this book
+        exact_index[(collection_id, file_number.upper())] = (book_id, file_number)
+        normalized_index[(collection_id, normalized_file_number)] = (book_id, file_number)
+        
         return (book_id, file_number), "created"
     except Exception as e:
         return None, f"error: {str(e)}"
 
 
-def insert_or_update_description(cursor, book_id: int, collection_id: int, 
+def insert_or_update_description(described_books: set, insert_rows: list, update_rows: list,
+                                 book_id: int, collection_id: int,
                                  book_number: str, data: Dict[str, Any]) -> str:
-    """Insert or update book description"""
-    cursor.execute(
-        "SELECT description_id FROM book_descriptions WHERE book_id = ? AND language = 'it'",
-        (book_id,)
-    )
-    existing = cursor.fetchone()
-    
-    full_data = {
-        'book_id': book_id,
-        'collection_id': collection_id,
-        'number': book_number,
-        'language': 'it',
-        **data
-    }
+    """Queue the insert or update of a book description for write_descriptions"""
+    # Every description column in a fixed order, None where nothing was extracted
+    values = [data.get(col) for col in DESCRIPTION_COLS]
+    
+    if book_id in described_books:
+        update_rows.append((*values, book_id))
+        return "updated"
+    
+    insert_rows.append((book_id, collection_id, book_number, 'it', *values))
+    described_books.add(book_id)
+    return "inserted"
+
+
+def write_descriptions(cursor, insert_rows: list, update_rows: list):
+    """Write the queued descriptions with one executemany per statement.
+    
+    Inserts go first so that a later file for the same book updates the row
+    inserted earlier in the run.
+    """
+    cursor.executemany(INSERT_DESCRIPTION_SQL, insert_rows)
+    cursor.executemany(UPDATE_DESCRIPTION_SQL, update_rows)
+
+
+@contextmanager
+def db_connection(db: str):
+    """Cached connection to db, held exclusively for the with block.
     
-    if existing:
-        description_id = existing[0]
-        set_clauses = []
-        values = []
+    Connections are in autocommit mode (transactions are opened and committed
+    explicitly) with BULK_PRAGMAS applied once. A transaction left open by an
+    error is rolled back; after a database error the connection is dropped so
+    the next call reconnects.
+    """
+    with _CONN_LOCK:
+        conn = _CONNS.get(db)
+        if conn is None:
+            # No type detection or row factory: rows stay plain tuples
+            conn = sqlite3.connect(
+                db, isolation_level=None, check_same_thread=False,
+                detect_types=0, cached_statements=256
+            )
+            for pragma in BULK_PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}")
+            _CONNS[db] = conn
+        try:
+            yield conn
+        except BaseException as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if isinstance(e, sqlite3.Error):
+                del _CONNS[db]
+                conn.close()
+            raise
+
+
+def list_docx_files(folder: str, errors: list) -> list:
+    """(filename, path, file_number, collection_id, collection_name) of each description in folder.
+    
+    Files that cannot be processed are reported in errors.
+    """
+    # "~$..." files are Word's lock files for open documents
+    with os.scandir(folder) as it:
+        entries = [entry for entry in it if entry.is_file() and not entry.name.startswith("~$")]
+    
+    docx_files = []
+    for entry in entries:
+        filename = entry.name
+        if filename.endswith(".doc"):
+            errors.append(f"Legacy .doc not supported, convert to .docx: {filename}")
+            continue
+        if not filename.endswith(".docx"):
+            continue
         
-        for key, value in data.items():
-            set_clauses.append(f"{key} = ?")
-            values.append(value)
+        # Extract number and collection
+        match = FILENAME_RE.search(filename)
+        if not match:
+            errors.append(f"Could not parse: {filename}")
+            continue
         
-        if set_clauses:
-            values.append(description_id)
-            sql = f"UPDATE book_descriptions SET {', '.join(set_clauses)} WHERE description_id = ?"
-            cursor.execute(sql, values)
-            return "updated"
-    else:
-        columns = list(full_data.keys())
-        placeholders = ['?' for _ in columns]
+        file_number = match.group(1).upper()
+        collection_id, collection_name = determine_collection_from_filename(filename)
         
-        sql = f"INSERT INTO book_descriptions ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(sql, list(full_data.values()))
-        return "inserted"
+        if not collection_id:
+            errors.append(f"Unknown collection: {filename}")
+            continue
+        
+        docx_files.append((filename, entry.path, file_number, collection_id, collection_name))
+    return docx_files
+
+
+def parse_docx_files(docx_paths: list) -> list:
+    """extract_data_job results for docx_paths, computed in worker processes.
+    
+    The workers are spawned rather than forked: this runs in an executor
+    thread of the server, and a child forked from a multi-threaded process can
+    inherit locks held by the other threads and hang on them.
+    """
+    if not docx_paths:
+        return []
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(extract_data_job, docx_paths, chunksize=4))
 
 
 def _update_descriptions_sync(folder: str, db: str) -> dict:
-    """Synchronous version of update_descriptions_from_docx"""
-    conn = sqlite3.connect(db)
-    cursor = conn.cursor()
+    """Synchronous version of update_descriptions_from_docx
     
-    # Check table exists
-    cursor.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'"
-    )
-    if not cursor.fetchone():
-        conn.close()
-        return {
-            "error": "book_descriptions table does not exist",
-            "message": "Please run migration script first"
-        }
+    The files are parsed before the database work, so the connection lock and
+    the transaction are not held while the workers run.
+    """
+    with db_connection(db) as conn:
+        cursor = conn.cursor()
+        # Check table exists
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'"
+        )
+        if not cursor.fetchone():
+            return {
+                "error": "book_descriptions table does not exist",
+                "message": "Please run migration script first"
+            }
+    
+    errors = []
+    docx_files = list_docx_files(folder, errors)
+    # Files are independent until they are written, so they are parsed in
+    # worker processes; the database work stays in this thread
+    extracted = parse_docx_files([docx_path for _, docx_path, *_ in docx_files])
+    
+    with db_connection(db) as conn:
+        return _update_descriptions(conn, docx_files, extracted, errors)
+
+
+def _update_descriptions(conn: sqlite3.Connection, docx_files: list, extracted: list, errors: list) -> dict:
+    """Write the descriptions parsed from docx_files in one transaction on conn.
+    
+    extracted holds the extract_data_job result of each file, and errors the
+    problems already found while listing them.
+    """
+    cursor = conn.cursor()
     
     # Get current counts
     cursor.execute(
@@ -279,43 +369,34 @@ def _update_descriptions_sync(folder: str, db: str) -> dict:
         "updated": 0,
         "not_found": 0,
         "books_created": 0,
-        "errors": [],
+        "errors": errors,
         "details": []
     }
     
+    # Books are looked up in memory rather than queried per file
+    book_index = build_book_index(cursor)
+    # Books that already have a description, to queue inserts vs updates
+    cursor.execute("SELECT book_id FROM book_descriptions WHERE language = 'it'")
+    described_books = {row[0] for row in cursor.fetchall()}
+    insert_rows = []
+    update_rows = []
+    
+    # One explicit transaction for the whole run
+    cursor.execute("BEGIN")
+    
     # Process each DOCX file
-    for filename in os.listdir(folder):
-        if not filename.endswith((".docx", ".doc")):
-            continue
-        
-        # Extract number and collection
-        match = re.search(r'Scheda descrittiva_([A-Za-z0-9()]+)_VERIFICATA', filename)
-        if not match:
-            stats["errors"].append(f"Could not parse: {filename}")
-            continue
-        
-        file_number = match.group(1).upper()
-        collection_id, collection_name = determine_collection_from_filename(filename)
-        
-        if not collection_id:
-            stats["errors"].append(f"Unknown collection: {filename}")
-            continue
-        
-        docx_path = os.path.join(folder, filename)
-        
+    for (filename, docx_path, file_number, collection_id, collection_name), (data, has_hyperlinks, error) in zip(docx_files, extracted):
         # Extract data first to get author name
-        try:
-            data = extract_data_from_docx(docx_path)
-            if not data:
-                stats["errors"].append(f"No data extracted: {filename}")
-                continue
-        except Exception as e:
-            stats["errors"].append(f"Error processing {filename}: {str(e)}")
+        if error:
+            stats["errors"].append(f"Error processing {filename}: {error}")
+            continue
+        if not data:
+            stats["errors"].append(f"No data extracted: {filename}")
             continue
         
         # Find or create book
         author = data.get('author', 'Unknown')
-        book_result = find_or_create_book(cursor, file_number, collection_id, author)
+        book_result = find_or_create_book(cursor, book_index, file_number, collection_id, author)
         
         if book_result[1].startswith("error"):
             stats["errors"].append(f"Error with book {file_number}: {book_result[1]}")
@@ -334,38 +415,44 @@ def _update_descriptions_sync(folder: str, db: str) -> dict:
         if status == "created":
             stats["books_created"] += 1
         
-        # Insert or update description
-        try:
-            action = insert_or_update_description(cursor, book_id, collection_id, db_number, data)
-            
-            detail = {
-                "filename": filename,
-                "book_number": db_number,
-                "collection": collection_name,
-                "action": action,
-                "book_status": status
-            }
-            
-            # Check for hyperlinks
-            for col, value in list(data.items())[:2]:
-                if '<a href=' in str(value):
-                    detail["has_hyperlinks"] = True
-                    break
-            
-            stats["details"].append(detail)
-            
-            if action == "updated":
-                stats["updated"] += 1
-            else:
-                stats["inserted"] += 1
-            
-            stats["processed"] += 1
-            
-        except Exception as e:
-            stats["errors"].append(f"Database error for book {db_number}: {str(e)}")
+        # Insert or update description; rows are written in one batch after the loop
+        action = insert_or_update_description(
+            described_books, insert_rows, update_rows, book_id, collection_id, db_number, data
+        )
+        
+        detail = {
+            "filename": filename,
+            "book_number": db_number,
+            "collection": collection_name,
+            "action": action,
+            "book_status": status
+        }
+        
+        # Flagged during extraction
+        if has_hyperlinks:
+            detail["has_hyperlinks"] = True
+        
+        stats["details"].append(detail)
+        
+        if action == "updated":
+            stats["updated"] += 1
+        else:
+            stats["inserted"] += 1
+        
+        stats["processed"] += 1
+    
+    # A failing batch is undone on its own; the created books are kept
+    cursor.execute("SAVEPOINT descriptions")
+    try:
+        write_descriptions(cursor, insert_rows, update_rows)
+    except sqlite3.Error as e:
+        cursor.execute("ROLLBACK TO descriptions")
+        stats["errors"].append(f"Database error while writing descriptions: {str(e)}")
+        stats["processed"] = stats["inserted"] = stats["updated"] = 0
+        stats["details"].clear()
+    cursor.execute("RELEASE descriptions")
     
-    conn.commit()
-    conn.close()
+    cursor.execute("COMMIT")
     
     return {
         "success": True,
@@ -383,6 +470,43 @@ def _update_descriptions_sync(folder: str, db: str) -> dict:
     }
 
 
+def _database_stats_sync(db: str) -> dict:
+    """Synchronous part of get_database_stats"""
+    with db_connection(db) as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'"
+        )
+        has_descriptions = cursor.fetchone() is not None
+        
+        stats = {
+            "database_path": db,
+            "has_descriptions_table": has_descriptions
+        }
+        
+        if has_descriptions:
+            cursor.execute(
+                "SELECT COUNT(*) FROM book_descriptions WHERE collection_id = ?",
+                (CINQUECENTINE_COLLECTION_ID,)
+            )
+            stats["cinquecentine_descriptions"] = cursor.fetchone()[0]
+            
+            cursor.execute(
+                "SELECT COUNT(*) FROM book_descriptions WHERE collection_id = ?",
+                (INCUNABOLI_COLLECTION_ID,)
+            )
+            stats["incunaboli_descriptions"] = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM books WHERE collection_id = ?", (CINQUECENTINE_COLLECTION_ID,))
+        stats["cinquecentine_books"] = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM books WHERE collection_id = ?", (INCUNABOLI_COLLECTION_ID,))
+        stats["incunaboli_books"] = cursor.fetchone()[0]
+    
+    return stats
+
+
 # ========== MCP TOOLS ==========
 
 @server.list_tools()
@@ -411,7 +535,12 @@ async def handle_list_tools() -> list[types.Tool]:
             description="Process new book folders and generate IIIF manifests and React viewer components",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "force": {
+                        "type": "boolean",
+                        "description": "Process every book folder, including the ones unchanged since the last run (default: false)"
+                    }
+                }
             }
         ),
         types.Tool(
@@ -488,12 +617,13 @@ async def handle_call_tool(
     
     elif name == "process_new_books":
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, process_book_folder, CONFIG["watch_path"])
+        force = bool(arguments.get("force", False))
+        count = await loop.run_in_executor(None, process_all_books, CONFIG["watch_path"], force)
         
         import json
         return [types.TextContent(
             type="text",
-            text=json.dumps({"success": True, "message": "Books processed successfully"}, indent=2)
+            text=json.dumps({"success": True, "message": f"{count} books processed successfully"}, indent=2)
         )]
     
     elif name == "get_database_stats":
@@ -506,39 +636,8 @@ async def handle_call_tool(
             )]
         
         try:
-            conn = sqlite3.connect(db)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='book_descriptions'"
-            )
-            has_descriptions = cursor.fetchone() is not None
-            
-            stats = {
-                "database_path": db,
-                "has_descriptions_table": has_descriptions
-            }
-            
-            if has_descriptions:
-                cursor.execute(
-                    "SELECT COUNT(*) FROM book_descriptions WHERE collection_id = ?",
-                    (CINQUECENTINE_COLLECTION_ID,)
-                )
-                stats["cinquecentine_descriptions"] = cursor.fetchone()[0]
-                
-                cursor.execute(
-                    "SELECT COUNT(*) FROM book_descriptions WHERE collection_id = ?",
-                    (INCUNABOLI_COLLECTION_ID,)
-                )
-                stats["incunaboli_descriptions"] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM books WHERE collection_id = ?", (CINQUECENTINE_COLLECTION_ID,))
-            stats["cinquecentine_books"] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM books WHERE collection_id = ?", (INCUNABOLI_COLLECTION_ID,))
-            stats["incunaboli_books"] = cursor.fetchone()[0]
-            
-            conn.close()
+            loop = asyncio.get_event_loop()
+            stats = await loop.run_in_executor(None, _database_stats_sync, db)
             
             import json
             return [types.TextContent(
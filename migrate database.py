@@ -151,6 +151,31 @@ def create_book_descriptions_table(db_path):
         return False
 
 
+def create_books_indexes(db_path):
+    """Create the indexes used by the lookups on the books table (idempotent)"""
+    print("\n📇 Checking 'books' indexes...")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    # Author lookups by number (generator.get_authors_from_database)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_books_number 
+        ON books(number)
+    """)
+    print("   ✅ Index on number")
+    
+    # Lookups of a number within one collection
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_books_collection_number 
+        ON books(collection_id, number)
+    """)
+    print("   ✅ Index on (collection_id, number)")
+    
+    conn.commit()
+    conn.close()
+
+
 def check_books_table(db_path):
     """Verify the books table exists"""
     print("\n🔍 Checking 'books' table...")
@@ -213,6 +238,8 @@ def main():
         print("\n⚠️  Cannot proceed without 'books' table")
         return 1
     
+    create_books_indexes(db_path)
+    
     # Create book_descriptions table
     print()
     success = create_book_descriptions_table(db_path)
@@ -19,7 +19,7 @@ python3 --version || {
 # Install Python dependencies
 echo ""
 echo "📦 Installing Python dependencies..."
-pip install watchdog python-docx modelcontextprotocol pandas openpyxl --break-system-packages || {
+pip install python-docx modelcontextprotocol pandas openpyxl --break-system-packages || {
     echo "❌ Failed to install Python dependencies"
     exit 1
 }
@@ -1,41 +1,111 @@
-from docx import Document
+import functools
 import os
 import re
+import string
 
-def strip_html_tags(text):
-    """
-    Remove HTML tags from text while preserving the content.
-    Example: '<a href="...">Isocrates</a>' -> 'Isocrates'
-    """
-    if not text:
-        return text
-    
-    # Remove HTML tags but keep the text inside
-    clean_text = re.sub(r'<[^>]+>', '', text)
-    return clean_text.strip()
+from docx_fields import iter_docx_paragraphs
+# The project's one tag stripper, shared with the manifest generator
+from generator import strip_html_tags
+
+# An author line, compiled once at import ("Author:" or "Autore:"), capturing the value
+AUTHOR_RE = re.compile(r'Aut(?:hor|ore):(.*)')
+
+# ASCII bytes deleted from an author name to make it a JS identifier part;
+# non-ASCII characters are dropped while encoding
+NON_ALNUM_BYTES = bytes(b for b in range(128) if not chr(b).isalnum())
+
+# Viewer page filled in by generate_js_file ($-placeholders, braces are literal)
+VIEWER_TEMPLATE = string.Template("""\
+'use client';
+import React from 'react';
+import dynamic from 'next/dynamic';
+
+const MiradorViewer = dynamic(
+  () => import('../../../components/MiradorWrapper'),
+  { ssr: false }
+);
+
+function $component_name() {
+  return (
+    <div className="viewer-container" style={{height:'100vh',width:'100%',margin:0,padding:0,overflow:'hidden',position:'relative',display:'flex',flexDirection:'column'}}>
+      <style jsx global>{{`
+        html, body {{margin: 0; padding: 0; height: 100%; overflow: hidden;}}
+        #__next, main {{height: 100%; margin: 0; padding: 0;}}
+      `}}</style>
+
+      <MiradorViewer 
+        config={{
+          id: 'mirador-viewer-$book_id-$author_kebab',
+          selectedTheme: 'dark',
+          themes: {{
+            dark: {{
+              palette: {{
+                mode: 'dark',
+                primary: {{ main: '#262426' }},
+                secondary: {{ main: '#d9b991' }}
+              }}
+            }}
+          }},
+          windows: [{{
+            loadedManifest: '$manifest_url/manifest.json',
+            canvasIndex: 0
+          }}],
+          window: {{
+            allowClose: false,
+            allowMaximize: false,
+            allowFullscreen: true,
+            allowWindowSideBar: true,
+            sideBarOpenByDefault: false
+          }},
+          workspace: {{
+            showZoomControls: true,
+            type: 'mosaic'
+          }},
+          thumbnailNavigation: {{
+            defaultPosition: 'far-bottom',
+            displaySettings: true
+          }}
+        }}
+      />
+    </div>
+  );
+}
+
+export default $component_name;
+""")
 
 
 def extract_author_from_docx(docx_path):
     """Extract author name from DOCX file, stripping any HTML tags"""
     try:
-        document = Document(docx_path)
-        text = "\n".join(p.text for p in document.paragraphs)
-        
-        # Very simple rule — customize this
-        for line in text.splitlines():
-            if "Author:" in line or "Autore:" in line:
+        st = os.stat(docx_path)
+    except OSError as e:
+        print(f"⚠️ Failed to read docx {docx_path}: {e}")
+        return "Unknown Author"
+    # An unchanged file (same mtime and size) is not parsed again
+    return _extract_author_from_docx(docx_path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_author_from_docx(docx_path, mtime_ns, size):
+    """Author of one version of a DOCX file; mtime_ns and size are only cache keys"""
+    try:
+        # Very simple rule — customize this. Paragraphs are read one at a time
+        # and the scan stops at the first author line.
+        lines = (line for _, text in iter_docx_paragraphs(docx_path) for line in text.splitlines())
+        for line in lines:
+            match = AUTHOR_RE.search(line)
+            if match:
                 # Extract author value
-                if "Author:" in line:
-                    author = line.split("Author:")[1].strip()
-                else:
-                    author = line.split("Autore:")[1].strip()
+                author = match.group(1).strip()
                 
                 # Strip HTML tags if present
                 author = strip_html_tags(author)
                 
                 # Remove any remaining special characters or extra info
-                # Keep only the main name (before any dates or extra info)
-                author = re.split(r'[<\(]', author)[0].strip()
+                # Keep only the main name (before the first '<' or '(' of any dates or extra info)
+                cut = min((i for i in (author.find('<'), author.find('(')) if i >= 0), default=len(author))
+                author = author[:cut].strip()
                 
                 # Remove trailing punctuation
                 author = author.rstrip('.,;')
@@ -56,73 +126,37 @@ def generate_js_file(folder, book_id, author, manifest_url):
     
     # Create safe version for JavaScript variable names
     # Remove any characters that aren't alphanumeric
-    author_safe = re.sub(r'[^a-zA-Z0-9]', '', author)
+    author_safe = author.encode('ascii', 'ignore').translate(None, NON_ALNUM_BYTES).decode('ascii')
     if not author_safe:
         author_safe = "Unknown"
     
-    js_name = f"Viewer{book_id}{author_safe}.js"
+    # Component name and viewer id, computed once for the whole template
+    component_name = f"Viewer{book_id}{author_safe}"
+    author_kebab = author.replace(' ', '-').lower()
+    
+    js_name = f"{component_name}.js"
     js_path = os.path.join(folder, js_name)
 
-    js_content = f"""'use client';
-import React from 'react';
-import dynamic from 'next/dynamic';
-
-const MiradorViewer = dynamic(
-  () => import('../../../components/MiradorWrapper'),
-  {{ ssr: false }}
-);
-
-function Viewer{book_id}{author_safe}() {{
-  return (
-    <div className="viewer-container" style={{{{height:'100vh',width:'100%',margin:0,padding:0,overflow:'hidden',position:'relative',display:'flex',flexDirection:'column'}}}}>
-      <style jsx global>{{{{`
-        html, body {{{{margin: 0; padding: 0; height: 100%; overflow: hidden;}}}}
-        #__next, main {{{{height: 100%; margin: 0; padding: 0;}}}}
-      `}}}}</style>
-
-      <MiradorViewer 
-        config={{{{
-          id: 'mirador-viewer-{book_id}-{author.replace(' ', '-').lower()}',
-          selectedTheme: 'dark',
-          themes: {{{{
-            dark: {{{{
-              palette: {{{{
-                mode: 'dark',
-                primary: {{{{ main: '#262426' }}}},
-                secondary: {{{{ main: '#d9b991' }}}}
-              }}}}
-            }}}}
-          }}}},
-          windows: [{{{{
-            loadedManifest: '{manifest_url}/manifest.json',
-            canvasIndex: 0
-          }}}}],
-          window: {{{{
-            allowClose: false,
-            allowMaximize: false,
-            allowFullscreen: true,
-            allowWindowSideBar: true,
-            sideBarOpenByDefault: false
-          }}}},
-          workspace: {{{{
-            showZoomControls: true,
-            type: 'mosaic'
-          }}}},
-          thumbnailNavigation: {{{{
-            defaultPosition: 'far-bottom',
-            displaySettings: true
-          }}}}
-        }}}}
-      />
-    </div>
-  );
-}}
-
-export default Viewer{book_id}{author_safe};
-"""
+    js_content = VIEWER_TEMPLATE.substitute(
+        component_name=component_name,
+        book_id=book_id,
+        author_kebab=author_kebab,
+        manifest_url=manifest_url,
+    )
 
-    with open(js_path, "w", encoding="utf-8") as f:
-        f.write(js_content)
+    # Encoded in one go and written with a single call; an identical file is
+    # left alone so the Next.js dev server does not recompile it
+    data = js_content.encode("utf-8")
+    try:
+        with open(js_path, "rb") as f:
+            unchanged = f.read() == data
+    except OSError:
+        unchanged = False
+    if unchanged:
+        print(f"🧩 Viewer JS unchanged: {js_path}")
+        return
+    with open(js_path, "wb") as f:
+        f.write(data)
 
     print(f"🧩 Viewer JS created: {js_path}")
     print(f"   Author: {author} (cleaned from HTML)")
\ No newline at end of file
@@ -0,0 +1,103 @@
+import functools
+import re
+
+# Characters not allowed in a JS identifier, and a leading digit
+IDENTIFIER_RE = re.compile(r'\W|^(?=\d)')
+
+# Next.js page for the Mirador viewer of one book, filled in by render_viewer_js
+VIEWER_TEMPLATE = """\
+'use client';
+import React from 'react';
+import dynamic from 'next/dynamic';
+
+const MiradorViewer = dynamic(
+  () => import('../../../components/MiradorWrapper'),
+  {{ ssr: false }}
+);
+
+function {component_name}() {{
+  return (
+    <div className="viewer-container" style={{{{
+      height: '100vh',
+      width: '100%',
+      margin: 0,
+      padding: 0,
+      overflow: 'hidden',
+      position: 'relative',
+      display: 'flex',
+      flexDirection: 'column'
+    }}}}>
+      <style jsx global>{{`
+        html, body {{
+          margin: 0;
+          padding: 0;
+          height: 100%;
+          overflow: hidden;
+        }}
+
+        #__next, main {{
+          height: 100%;
+          margin: 0;
+          padding: 0;
+        }}
+      `}}</style>
+
+      <MiradorViewer 
+        config={{{{
+          id: 'mirador-viewer-{book_id_lower}',
+          selectedTheme: 'dark',
+          themes: {{
+            dark: {{
+              palette: {{
+                mode: 'dark',
+                primary: {{ main: '#262426' }},
+                secondary: {{ main: '#d9b991' }}
+              }}
+            }}
+          }},
+          windows: [
+            {{
+              loadedManifest: '{manifest_url}/manifest.json',
+              canvasIndex: 0
+            }}
+          ],
+          window: {{
+            allowClose: false,
+            allowMaximize: false,
+            allowFullscreen: true,
+            allowWindowSideBar: true,
+            sideBarOpenByDefault: false
+          }},
+          workspace: {{
+            showZoomControls: true,
+            type: 'mosaic'
+          }},
+          thumbnailNavigation: {{
+            defaultPosition: 'far-bottom',
+            displaySettings: true
+          }}
+        }}}}
+      />
+    </div>
+  );
+}}
+
+export default {component_name};
+"""
+
+@functools.lru_cache(maxsize=4096)
+def make_valid_identifier(name):
+    """Turn a book id into a PascalCase JS identifier"""
+    # Replace hyphens and invalid characters with underscores
+    name = IDENTIFIER_RE.sub('_', name)
+    # Capitalize parts to make it PascalCase
+    parts = name.split('_')
+    return ''.join(part.capitalize() for part in parts if part)
+
+def render_viewer_js(book_id, manifest_url):
+    """Source of the viewer page for a book whose manifest lives under manifest_url"""
+    return VIEWER_TEMPLATE.format(
+        component_name='Viewer' + make_valid_identifier(book_id),
+        book_id_lower=book_id.lower(),
+        manifest_url=manifest_url
+    )
@@ -1,23 +1,81 @@
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from generator import process_book_folder
+import os
+import signal
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-class BookHandler(FileSystemEventHandler):
-    def on_created(self, event):
-        if event.is_directory:
-            print(f"📁 New book folder detected: {event.src_path}")
-            process_book_folder(event.src_path)
+from generator import (folder_state, get_author_from_database, mark_processed, process_all_books,
+                       process_book_folder)
 
-def start_watching(path):
-    observer = Observer()
-    event_handler = BookHandler()
-    observer.schedule(event_handler, path, recursive=False)
-    observer.start()
-    print(f"👀 Watching folder: {path}")
+def list_book_folders(path):
+    """Names of the folders directly inside path"""
+    with os.scandir(path) as it:
+        return {entry.name for entry in it if entry.is_dir()}
+
+def process_new_folder(book_folder):
+    """Process one new book folder, reporting errors instead of losing them in the pool
+
+    The folder is then recorded in the processed cache, so the next backfill
+    skips it.
+    """
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+        author = get_author_from_database(os.path.basename(book_folder))
+        process_book_folder(book_folder, author=author)
+        mark_processed(book_folder, author)
+    except Exception as e:
+        print(f"⚠️  Failed to process {book_folder}: {e}")
+
+def start_watching(path, interval=1.0, workers=4, settle=2.0, backfill=True):
+    """Poll path for new book folders and process them in worker threads
+
+    The folder is listed every interval seconds and compared with the previous
+    listing, so files written into it cost nothing. A new folder is processed
+    once its state (see generator.folder_state) has not changed for settle
+    seconds, so a folder still being copied is processed once, complete. New
+    folders are queued to a pool of workers threads, so a slow book never
+    holds up the polling loop or the books detected after it.
+
+    With backfill, the folders added or changed while the watcher was not
+    running are processed first, in parallel, by generator.process_all_books
+    (which skips the ones its cache records as done).
+    """
+    # Listed before the backfill: folders created meanwhile are caught by the first poll
+    known = list_book_folders(path)
+    if backfill:
+        try:
+            process_all_books(path)
+        except Exception as e:
+            print(f"⚠️  Backfill of {path} failed: {e}")
+    # New folders waiting to settle: name -> (last state, time it was seen)
+    pending = {}
+    # Set by SIGTERM (signals can only be handled in the main thread) to stop
+    # cleanly, after the books being processed are done
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    print(f"👀 Watching folder: {path}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while not stop.wait(interval):
+                current = list_book_folders(path)
+                now = time.monotonic()
+                for name in sorted(current - known):
+                    print(f"📁 New book folder detected: {os.path.join(path, name)}")
+                    pending[name] = (None, now)
+                known = current
+                
+                for name, (state, since) in list(pending.items()):
+                    book_folder = os.path.join(path, name)
+                    try:
+                        new_state = folder_state(book_folder)
+                    except OSError:
+                        # Removed or renamed before it settled
+                        del pending[name]
+                        continue
+                    if new_state != state:
+                        pending[name] = (new_state, now)
+                    elif now - since >= settle:
+                        del pending[name]
+                        executor.submit(process_new_folder, book_folder)
+        except KeyboardInterrupt:
+            pass